@@ -1,6 +1,7 @@
 import logging
+import re
 from typing import Dict, List, Optional, Literal, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from director.agents.base import BaseAgent, AgentResponse, AgentStatus
 from director.core.session import TextContent, MsgStatus, OutputMessage, Session
@@ -9,13 +10,69 @@ from director.llm.base import LLMResponseStatus
 
 logger = logging.getLogger(__name__)
 
+_CONVERSATION_PROMPT = """Create 3 example sales conversations that demonstrate the effective use of the provided sales techniques.
+        Each conversation should show a different scenario and combination of techniques.
+        
+        Your response must follow this exact structure:
+        {
+            "explanation": "Brief explanation of how these conversations demonstrate the sales techniques",
+            "conversations": [
+                {
+                    "title": "Title describing the conversation scenario",
+                    "scenario": "Detailed description of the scenario",
+                    "techniques_used": ["List of techniques demonstrated"],
+                    "conversation": [
+                        {
+                            "role": "user",
+                            "content": "Customer message"
+                        },
+                        {
+                            "role": "assistant",
+                            "content": "Sales agent response"
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        REQUIREMENTS:
+        1. Generate exactly 3 conversations
+        2. Each conversation must demonstrate different techniques
+        3. Keep responses natural and realistic
+        4. Show proper handling of objections
+        5. Demonstrate effective closing techniques
+        6. Include a mix of different techniques in each conversation
+        7. Keep responses concise but effective
+        
+        Available Techniques:
+        {techniques}
+        
+        Communication Strategies:
+        {strategies}
+        
+        Objection Handling:
+        {objections}
+        
+        Closing Techniques:
+        {closing}"""
+
+# Literal segments between the section placeholders, split once at import
+_CONVERSATION_PROMPT_SEGS = tuple(
+    re.split(r"\{(?:techniques|strategies|objections|closing)\}", _CONVERSATION_PROMPT)
+)
+
+# Parsed from LLM JSON and only read afterwards
+_FROZEN_MODEL_CONFIG = ConfigDict(frozen=True, extra='ignore', populate_by_name=True)
+
 class ConversationMessage(BaseModel):
     """A single message in a conversation"""
+    model_config = _FROZEN_MODEL_CONFIG
     role: Literal["user", "assistant"]
     content: str
 
 class Conversation(BaseModel):
     """A complete conversation example"""
+    model_config = _FROZEN_MODEL_CONFIG
     title: str
     scenario: str
     techniques_used: List[str]
@@ -23,6 +80,7 @@ class Conversation(BaseModel):
 
 class ConversationResponse(BaseModel):
     """The complete response structure for conversation generation"""
+    model_config = _FROZEN_MODEL_CONFIG
     explanation: str
     conversations: List[Conversation]
 
@@ -73,52 +131,6 @@ class SalesConversationAgent(BaseAgent):
 
     def _get_conversation_prompt(self, analysis_data: dict) -> str:
         """Generate prompt for example conversations."""
-        prompt = """Create 3 example sales conversations that demonstrate the effective use of the provided sales techniques.
-        Each conversation should show a different scenario and combination of techniques.
-        
-        Your response must follow this exact structure:
-        {
-            "explanation": "Brief explanation of how these conversations demonstrate the sales techniques",
-            "conversations": [
-                {
-                    "title": "Title describing the conversation scenario",
-                    "scenario": "Detailed description of the scenario",
-                    "techniques_used": ["List of techniques demonstrated"],
-                    "conversation": [
-                        {
-                            "role": "user",
-                            "content": "Customer message"
-                        },
-                        {
-                            "role": "assistant",
-                            "content": "Sales agent response"
-                        }
-                    ]
-                }
-            ]
-        }
-        
-        REQUIREMENTS:
-        1. Generate exactly 3 conversations
-        2. Each conversation must demonstrate different techniques
-        3. Keep responses natural and realistic
-        4. Show proper handling of objections
-        5. Demonstrate effective closing techniques
-        6. Include a mix of different techniques in each conversation
-        7. Keep responses concise but effective
-        
-        Available Techniques:
-        {techniques}
-        
-        Communication Strategies:
-        {strategies}
-        
-        Objection Handling:
-        {objections}
-        
-        Closing Techniques:
-        {closing}"""
-
         # Format techniques section
         techniques = "\n".join([
             f"- {t.get('name', 'Technique')}: {t.get('description', '')}"
@@ -143,12 +155,16 @@ class SalesConversationAgent(BaseAgent):
             for c in analysis_data.get("closing_techniques", [])
         ])
         
-        return prompt.format(
-            techniques=techniques or "No specific techniques provided",
-            strategies=strategies or "No specific strategies provided",
-            objections=objections or "No specific objection handling provided",
-            closing=closing or "No specific closing techniques provided"
-        )
+        # The template carries literal JSON braces, so it is filled by joining
+        # its pre-split segments rather than str.format
+        segs = _CONVERSATION_PROMPT_SEGS
+        return "".join((
+            segs[0], techniques or "No specific techniques provided",
+            segs[1], strategies or "No specific strategies provided",
+            segs[2], objections or "No specific objection handling provided",
+            segs[3], closing or "No specific closing techniques provided",
+            segs[4]
+        ))
 
     def _get_fallback_conversations(self) -> List[Dict]:
         """Return fallback conversation examples if generation fails."""
@@ -217,20 +233,20 @@ class SalesConversationAgent(BaseAgent):
             
             if response.status == LLMResponseStatus.ERROR:
                 logger.warning("OpenAI request failed, using fallback conversations")
-                conversations = self._get_fallback_conversations()
+                conversations = [Conversation.model_validate(c) for c in self._get_fallback_conversations()]
             else:
                 try:
                     # Parse the JSON response
-                    conversation_data = ConversationResponse.parse_raw(response.content)
+                    conversation_data = ConversationResponse.model_validate_json(response.content)
                     conversations = conversation_data.conversations
                 except Exception as e:
                     logger.error(f"Failed to parse conversation response: {e}")
-                    conversations = self._get_fallback_conversations()
+                    conversations = [Conversation.model_validate(c) for c in self._get_fallback_conversations()]
             
             # Store results
             text_content.text = "Example conversations generated successfully"
             text_content.conversation_data = {
-                "conversations": [conv.dict() for conv in conversations],
+                "conversations": [conv.model_dump() for conv in conversations],
                 "analysis_data": analysis_data
             }
             
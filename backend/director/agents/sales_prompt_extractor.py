@@ -1,73 +1,267 @@
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import sys
-import codecs
-from typing import Dict, List, Optional, Any, Literal
+import threading
+import concurrent.futures
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Union
 import json
 import re
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 import time
 import os
-from sqlalchemy.orm import Session as SQLAlchemySession
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from contextlib import contextmanager
+from functools import cached_property
 import yaml
 
 from director.agents.base import BaseAgent, AgentResponse, AgentStatus
 from director.agents.transcription import TranscriptionAgent
 from director.agents.summarize_video import SummarizeVideoAgent
-from director.agents.sales_voice_prompt_agent import SalesVoicePromptAgent
-from director.agents.sales_conversation_agent import SalesConversationAgent
-from director.core.session import (
-    Session,
-    TextContent,
-    MsgStatus,
-    ContextMessage,
-    RoleTypes,
-    OutputMessage,
-)
+from director.core.session import Session, TextContent, MsgStatus
 from director.llm import get_default_llm
-from director.tools.anthropic_tool import AnthropicTool
-from director.llm.openai import OpenAI, OpenaiConfig, OpenAIChatModel
-from director.llm.base import LLMResponseStatus
+from director.llm.openai import OpenAI, OpenaiConfig
 from director.agents.voice_prompt_generation_agent import VoicePromptGenerationAgent
 from director.agents.structured_data_agent import StructuredDataAgent
 from director.agents.yaml_configuration_agent import YAMLConfigurationAgent
-from director.core.database import Analysis, StructuredData, YAMLConfig, VoicePrompt, Session as DBSession
+from director.core.database import Analysis, Session as DBSession
 from director.utils.supabase import SupabaseVectorStore
-from director.tools.sales_analysis_tool import SalesAnalysisTool
-
-# Configure UTF-8 encoding for stdout
-if sys.stdout.encoding != 'utf-8':
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
-
-# Configure logging with UTF-8 encoding and file output
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('sales_prompt_extractor.log', encoding='utf-8'),
-        logging.StreamHandler(codecs.getwriter('utf-8')(sys.stdout.buffer) if hasattr(sys.stdout, 'buffer') else sys.stdout)
-    ]
-)
-
-logger = logging.getLogger(__name__)
+from director.utils import fast_json
+from director.utils.analysis_cache import AnalysisCache
+from director.tools.sales_analysis_tool import ANALYSIS_PROMPT_VERSION, AnalysisResult, SalesAnalysisTool
+
+# Configure UTF-8 encoding for stdout, keeping the native TextIOWrapper.
+# Unencodable characters are replaced rather than raised so a stray byte in a
+# transcript never breaks logging.
+for _stream in (sys.stdout, sys.stderr):
+    if hasattr(_stream, 'reconfigure') and (_stream.encoding or '').lower() != 'utf-8':
+        _stream.reconfigure(encoding='utf-8', errors='replace')
+
+# Configure logging with UTF-8 encoding, plus file output when
+# DIRECTOR_LOG_TO_FILE is set. Records are queued and written by a listener
+# thread so request threads never block on log I/O.
+_ARROW_TRANSLATION = str.maketrans({'→': '->', '←': '<-', '⇒': '=>', '⇐': '<='})
 
 def _clean_text_for_logging(text: str) -> str:
     """Clean text for logging by replacing problematic Unicode characters"""
-    return (text.replace('→', '->') 
-            .replace('←', '<-')
-            .replace('⇒', '=>')
-            .replace('⇐', '<=')
-            .encode('ascii', 'replace')
-            .decode('ascii'))
+    return text.translate(_ARROW_TRANSLATION).encode('ascii', 'replace').decode('ascii')
+
+class _CleanLogFormatter(logging.Formatter):
+    """Formatter that keeps console log lines ASCII-safe"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return _clean_text_for_logging(super().format(record))
+
+if not logging.getLogger().handlers:
+    _log_queue = queue.Queue(-1)
+    _console_handler = logging.StreamHandler(sys.stdout)
+    _console_handler.setFormatter(_CleanLogFormatter())
+    _log_handlers = [_console_handler]
+    if os.getenv('DIRECTOR_LOG_TO_FILE'):
+        _log_handlers.append(
+            RotatingFileHandler('sales_prompt_extractor.log', maxBytes=10_000_000, backupCount=3, encoding='utf-8')
+        )
+    _log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[QueueHandler(_log_queue)]
+    )
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+logger = logging.getLogger(__name__)
+
+# One pass line tokenizer for the analysis text. Every non-blank line matches
+# exactly one named alternative: a known section title (markdown "## Title" or
+# numbered "1. Title"), any other markdown heading, a DO/DON'T marker, a field
+# line ("Quote: ..."), a lettered/numbered item, a bullet, or plain text.
+_SECTION_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"(?:#{1,3}[ \t]*|\d+\.[ \t]+)?\**(?P<title>"
+    r"SUMMARY|Summary|Sales Techniques(?: Used)?|SALES TECHNIQUES"
+    r"|Communication Strategies|COMMUNICATION(?: STRATEGIES)?"
+    r"|Objection Handling|OBJECTIONS?(?: HANDLING)?"
+    r"|Voice Agent Guidelines|(?:VOICE AGENT )?GUIDELINES"
+    r"|Closing Techniques|Closing|CLOSING(?: TECHNIQUES)?"
+    r"|Key Phrases(?: to Use)?|KEY PHRASES|Script Templates?|SCRIPT TEMPLATES?"
+    r")\**[ \t]*:?\**"
+    r"|(?P<heading>#{1,3}[ \t]+.*)"
+    r"|(?P<marker>(?i:do(?:'?s)?|don'?t(?:'?s)?))[ \t]*:"
+    r"|(?:-[ \t]*)?(?P<field>Quote|Example|Effect|Effectiveness|Response|Customer|When to use):[ \t]*(?P<value>.*)"
+    r"|(?:[a-z]\)|\d+\.)(?=[ \t]|$)[ \t]*(?P<numbered>.*)"
+    r"|[-•*][ \t]*(?P<bullet>.*)"
+    r"|(?P<text>\S.*)"
+    r")[ \t]*$",
+    re.MULTILINE,
+)
+
+_NEWLINES_RE = re.compile(r'\n{3,}')
+
+# Section patterns for _extract_analysis_data, used when the analysis is not JSON
+_ANALYSIS_DATA_SECTIONS = tuple(
+    (key, re.compile(pattern, re.DOTALL))
+    for key, pattern in (
+        ("sales_techniques", r"(?i)sales\s+techniques?.*?(?=\n\n|$)"),
+        ("communication_strategies", r"(?i)communication\s+strategies?.*?(?=\n\n|$)"),
+        ("objection_handling", r"(?i)objection\s+handling.*?(?=\n\n|$)"),
+        ("voice_agent_guidelines", r"(?i)voice.*?guidelines?.*?(?=\n\n|$)"),
+    )
+)
+_BULLET_SPLIT_RE = re.compile(r'\n\s*[-•*]\s*')
+
+# <example> blocks in the training data and few-shot responses
+_TRAINING_EXAMPLE_RE = re.compile(
+    r'<example>\s*<input>(.*?)</input>\s*<output>(.*?)</output>\s*</example>',
+    re.DOTALL,
+)
+_FEW_SHOT_EXAMPLE_RE = re.compile(
+    r'<example>\s*<context>(.*?)</context>\s*<input>(.*?)</input>\s*'
+    r'<response>(.*?)</response>\s*<reasoning>(.*?)</reasoning>\s*</example>',
+    re.DOTALL,
+)
+
+# ``lastgroup`` reports the innermost group of a field line
+_TOKEN_KINDS = {"value": "field"}
+
+# Substring of a lowercased section title -> structured_data key, checked in order
+_SECTION_KEYS = (
+    ("summary", "summary"),
+    ("sales techniques", "sales_techniques"),
+    ("communication", "communication_strategies"),
+    ("objection", "objection_handling"),
+    ("guidelines", "voice_agent_guidelines"),
+    ("closing", "closing_techniques"),
+    ("key phrases", "key_phrases"),
+    ("script", "script_templates"),
+)
+
+def _section_for_title(title: str) -> Optional[str]:
+    """Map a section title matched by _SECTION_RE to its structured_data key"""
+    title = title.lower()
+    for needle, key in _SECTION_KEYS:
+        if needle in title:
+            return key
+    return None
+
+# (label key, primary text key) of the items in each list section of structured_data
+_ITEM_KEYS = {
+    "objection_handling": ("objection", "response"),
+    "communication_strategies": ("type", "description"),
+}
+_DEFAULT_ITEM_KEYS = ("name", "description")
+
+def _new_structured_item(section: str, label: str) -> Dict[str, Any]:
+    """Create an empty item for one of the list sections of structured_data"""
+    if section == "closing_techniques":
+        return {"name": label, "description": "", "examples": []}
+    label_key, primary = _ITEM_KEYS.get(section, _DEFAULT_ITEM_KEYS)
+    return {label_key: label, primary: "", "examples": [], "effectiveness": ""}
+
+PUSH_MIN_INTERVAL = 0.25  # seconds between intermediate progress writes
+# Cap on partial analysis text held in the message; a full COMBINED_MAX_TOKENS
+# completion is roughly 28K characters, so only runaway output is cut
+MAX_STREAMED_TEXT_CHARS = 64_000
+
+# Leaves room for the prompts and completion in the 128K analysis model context
+MAX_TRANSCRIPT_TOKENS = 100_000
+
+# Over-budget transcripts are condensed chunk by chunk before analysis
+MAP_CHUNK_TOKENS = 3000
+MAP_CHUNK_OVERLAP = 200
+MAP_WORKERS = 8
+
+TRANSCRIPT_FETCH_WORKERS = 4  # concurrent transcript lookups in run_batch
+
+_FILENAME_TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+
+def _batch_key(video_id: str, collection_id: str) -> str:
+    """Batch custom id for a job; the same video may appear in several collections"""
+    return f"{collection_id}:{video_id}"
+
+# Runs in progress per (video_id, collection_id, analysis_type); later callers
+# wait on the first run's future instead of repeating the analysis
+_INFLIGHT_RUNS: Dict[tuple, concurrent.futures.Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+# Analysis cache shared by every extractor, opened on first use so creating an
+# agent doesn't touch the cache directory or SQLite
+_PROMPT_CACHE: Optional[AnalysisCache] = None
+_PROMPT_CACHE_LOCK = threading.Lock()
+
+def _shared_prompt_cache() -> AnalysisCache:
+    """Return the process-wide analysis cache, creating it on first use"""
+    global _PROMPT_CACHE
+    with _PROMPT_CACHE_LOCK:
+        if _PROMPT_CACHE is None:
+            _PROMPT_CACHE = AnalysisCache(
+                version=f"{ANALYSIS_PROMPT_VERSION}:{SalesAnalysisTool.combined_model}:{SalesAnalysisTool.model}"
+            )
+        return _PROMPT_CACHE
+
+# Markdown exports and analysis cache stores are fire-and-forget writes; they
+# run here so the request thread never waits on disk
+_WRITE_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="sales-write")
+
+# Literal scaffolding of the saved analysis markdown, pre-encoded; the four
+# dynamic sections are spliced in between these segments
+_MARKDOWN_SEGS_B = tuple(seg.encode('utf-8') for seg in (
+    "# Sales Conversation Analysis\n\n## Raw Analysis\n",
+    "\n\n## YAML Configuration\n```yaml\n",
+    "\n```\n\n## Voice Agent Prompt\n```\n",
+    "\n```\n\n## Structured Data\n```json\n",
+    "\n```\n",
+))
+
+def _write_chunks(filepath: str, chunks: Iterable[bytes]) -> str:
+    """Write chunks to filepath in order with unbuffered os-level I/O"""
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        for chunk in chunks:
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    return filepath
+
+def _write_markdown_analysis(filepath: str, analysis_content: str, structured_data: Dict, voice_prompt: str, yaml_config: Dict) -> str:
+    """Render the analysis markdown straight to bytes and write it to filepath"""
+    # Encode each piece once; the literal scaffolding is pre-encoded. The
+    # pieces are written one after another rather than joined, so the file
+    # body is never held twice
+    segs = _MARKDOWN_SEGS_B
+    return _write_chunks(filepath, (
+        segs[0], str(analysis_content).encode('utf-8'),
+        segs[1], str(yaml_config).encode('utf-8'),
+        segs[2], str(voice_prompt).encode('utf-8'),
+        segs[3], fast_json.dumps_pretty_bytes(structured_data),
+        segs[4]
+    ))
+
+def _log_markdown_write(future: concurrent.futures.Future) -> None:
+    """Log the outcome of a background markdown write"""
+    error = future.exception()
+    if error:
+        logger.error("Error saving markdown analysis: %s", error)
+    else:
+        logger.info("Analysis saved to markdown file: %s", future.result())
+
+def _log_cache_write(future: concurrent.futures.Future) -> None:
+    """Log a failed background analysis cache write"""
+    error = future.exception()
+    if error:
+        logger.warning("Error caching analysis result: %s", error)
 
 SALES_PROMPT_PARAMETERS = {
     "type": "object",
     "properties": {
         "video_id": {
             "type": "string",
-            "description": "The ID of the video to analyze"
+            "description": "The ID of the video to analyze (omit for batch runs)"
         },
         "collection_id": {
             "type": "string", 
@@ -84,23 +278,161 @@ SALES_PROMPT_PARAMETERS = {
             "enum": ["structured", "text", "both"],
             "default": "both",
             "description": "Format of the analysis output"
+        },
+        "retry_failed": {
+            "type": "boolean",
+            "default": False,
+            "description": "Rerun an analysis whose previous failure was recorded as not retryable"
+        },
+        "batch_video_ids": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Videos in the collection to analyze together through the discounted batch API; results arrive within 24h"
+        },
+        "batch_id": {
+            "type": "string",
+            "description": "Batch returned by an earlier batch run, to collect its results"
         }
     },
-    "required": ["video_id", "collection_id"],
+    "required": ["collection_id"],
     "description": "Analyzes sales techniques and generates AI voice agent prompts",
     "bypass_reasoning": True,
     "example_queries": [
         "@sales_prompt_extractor analyze video_id=123 collection_id=456",
+        "@sales_prompt_extractor analyze collection_id=456 batch_video_ids=[123, 124]",
         "@sales_prompt_extractor"
     ]
 }
 
+# Analysis instructions, kept byte-identical across calls
+_SALES_SYSTEM_PROMPT = """You are an expert sales analyst. Your task is to analyze sales conversations and provide clear, actionable insights.
+Your analysis must include:
+1. A clear summary of the video content and key takeaways
+2. Specific sales techniques with examples from the transcript
+3. Communication strategies with actual phrases used
+4. Objection handling approaches demonstrated
+5. Voice agent guidelines based on successful patterns
+
+Provide your response in a structured format with:
+- A detailed markdown analysis
+- Structured data about sales techniques and metrics
+- A voice prompt that incorporates the successful patterns identified
+
+The voice prompt MUST be a concise, actionable prompt that guides an AI agent in replicating the successful techniques identified. 
+Format it as a direct instruction to the AI, starting with a greeting and including key approaches to use.
+
+IMPORTANT: Your response MUST include all three components:
+1. analysis (string): Detailed markdown analysis
+2. structured_data (object): Structured data about techniques and metrics
+3. voice_prompt (string): A concise, actionable prompt starting with "Hello!" and including specific instructions
+
+Example voice prompt format:
+"Hello! In your conversations, ensure to [key approach 1]. When customers [situation], respond with [technique]. Always maintain [style] and focus on [objective]. Thank you!"
+"""
+
+# System prompt for the voice agent, filled by _get_system_prompt
+_VOICE_AGENT_PROMPT = """You are an AI sales agent trained to engage in natural, empathetic, and effective sales conversations. Your responses should be guided by the following framework:
+
+ROLE AND PERSONA:
+- You are a professional, friendly, and knowledgeable sales consultant
+- You focus on understanding customer needs before proposing solutions
+- You maintain a balanced approach between being helpful and goal-oriented
+
+COMMUNICATION STYLE:
+- Use clear, concise, and professional language
+- Practice active listening and ask clarifying questions
+- Mirror the customer's communication style while maintaining professionalism
+- Show genuine interest in helping customers solve their problems
+
+KEY OBJECTIVES:
+1. Build trust and rapport with customers
+2. Understand customer needs through effective questioning
+3. Present relevant solutions based on customer requirements
+4. Address concerns and objections professionally
+5. Guide conversations toward positive outcomes
+
+ETHICAL GUIDELINES:
+1. Always be truthful and transparent
+2. Never pressure customers into decisions
+3. Respect customer privacy and confidentiality
+4. Only make promises you can keep
+5. Prioritize customer needs over immediate sales
+
+AVAILABLE TECHNIQUES AND STRATEGIES:
+
+Sales Techniques:
+{techniques}
+
+Communication Strategies:
+{strategies}
+
+Objection Handling:
+{objections}
+
+Voice Agent Guidelines:
+{guidelines}
+
+IMPLEMENTATION GUIDELINES:
+1. Start conversations by building rapport and understanding needs
+2. Use appropriate sales techniques based on the conversation context
+3. Address objections using the provided strategies
+4. Apply closing techniques naturally when customer shows interest
+5. Maintain a helpful and consultative approach throughout
+
+Remember to stay natural and conversational while implementing these guidelines."""
+
+# Literal segments between the section placeholders, split once at import
+_VOICE_AGENT_PROMPT_SEGS = tuple(
+    re.split(r"\{(?:techniques|strategies|objections|guidelines)\}", _VOICE_AGENT_PROMPT)
+)
+
+
+_NO_TECHNIQUES = "No specific techniques provided"
+_NO_STRATEGIES = "No specific strategies provided"
+_NO_OBJECTIONS = "No specific objection handling provided"
+_NO_GUIDELINES = "No specific guidelines provided"
+
+# The prompt rendered with every fallback, for analyses with no usable sections
+_DEFAULT_VOICE_AGENT_PROMPT = "".join((
+    _VOICE_AGENT_PROMPT_SEGS[0], _NO_TECHNIQUES,
+    _VOICE_AGENT_PROMPT_SEGS[1], _NO_STRATEGIES,
+    _VOICE_AGENT_PROMPT_SEGS[2], _NO_OBJECTIONS,
+    _VOICE_AGENT_PROMPT_SEGS[3], _NO_GUIDELINES,
+    _VOICE_AGENT_PROMPT_SEGS[4],
+))
+_VOICE_AGENT_SECTIONS = ("sales_techniques", "communication_strategies", "objection_handling", "voice_agent_guidelines")
+
+def _section_items(analysis_data: Dict, key: str) -> List:
+    """Items of one analysis section, or an empty list when it is missing or not a list"""
+    items = analysis_data.get(key)
+    return items if isinstance(items, list) else []
+
+def _format_named_item(item: Any) -> str:
+    """Format a technique or strategy bullet, from a name/description dict or plain text"""
+    if isinstance(item, dict):
+        return f"- {item.get('name', '')}: {item.get('description', '')}"
+    return f"- {item}"
+
+def _iter_bullets(lines: Iterable[str], fallback: str) -> Iterator[str]:
+    """Yield lines as a newline separated bullet list, or fallback when there are none"""
+    prefix = "- "
+    for line in lines:
+        yield prefix
+        yield line
+        prefix = "\n- "
+    if prefix == "- ":
+        yield fallback
+
 class AnthropicResponse(BaseModel):
     """Model for storing Anthropic responses"""
+    model_config = ConfigDict(frozen=True, extra='ignore', populate_by_name=True)
     content: str
     timestamp: datetime
     status: str
-    metadata: Dict = {}
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+# TypeAdapters are expensive to build, so share one across instances
+_ANTHROPIC_RESP_ADAPTER = TypeAdapter(AnthropicResponse)
 
 class SalesAnalysisContent(TextContent):
     """Content type for sales analysis results"""
@@ -109,14 +441,22 @@ class SalesAnalysisContent(TextContent):
     voice_prompt: str = ""
     structured_data: Dict = {}
     training_data: List[Dict] = []
+    few_shot_examples: List[Dict] = []
+    transcript_tokens: int = 0
     text_color: str = "#E4E4E7"  # Light gray color for dark theme readability
     
-    def __init__(self, analysis_data: Dict = None, anthropic_response: Dict = None, 
+    def __init__(self, analysis_data: Dict = None, anthropic_response: Union[Dict, AnthropicResponse] = None, 
                  voice_prompt: str = "", structured_data: Dict = None, 
                  training_data: List[Dict] = None, **kwargs):
         super().__init__(**kwargs)
         self.analysis_data = analysis_data if analysis_data is not None else {}
-        self.anthropic_response = AnthropicResponse(**anthropic_response) if anthropic_response else None
+        if isinstance(anthropic_response, AnthropicResponse):
+            # Already validated, skip a second pass
+            self.anthropic_response = anthropic_response
+        elif anthropic_response:
+            self.anthropic_response = _ANTHROPIC_RESP_ADAPTER.validate_python(anthropic_response)
+        else:
+            self.anthropic_response = None
         self.voice_prompt = voice_prompt
         self.structured_data = structured_data if structured_data is not None else {}
         self.training_data = training_data if training_data is not None else []
@@ -126,49 +466,35 @@ class SalesAnalysisContent(TextContent):
         base_dict = super().to_dict()
         base_dict.update({
             "analysis_data": self.analysis_data,
-            "anthropic_response": self.anthropic_response.dict() if self.anthropic_response else None,
+            "anthropic_response": _ANTHROPIC_RESP_ADAPTER.dump_python(self.anthropic_response, mode="json") if self.anthropic_response else None,
             "voice_prompt": self.voice_prompt,
             "structured_data": self.structured_data,
             "training_data": self.training_data,
+            "few_shot_examples": self.few_shot_examples,
+            "transcript_tokens": self.transcript_tokens,
             "text_color": self.text_color
         })
         return base_dict
 
     def store_anthropic_response(self, content: str, status: str = "success", metadata: Dict = None):
         """Store Anthropic response with metadata"""
-        self.anthropic_response = AnthropicResponse(
+        # Built from typed local values, so field validation is skipped
+        self.anthropic_response = AnthropicResponse.model_construct(
             content=content,
             timestamp=datetime.now(),
             status=status,
             metadata=metadata or {}
         )
 
-class ConversationMessage(BaseModel):
-    """A single message in a conversation"""
-    role: Literal["user", "assistant"]
-    content: str
-
-class Conversation(BaseModel):
-    """A complete conversation example"""
-    title: str
-    scenario: str
-    techniques_used: List[str]
-    conversation: List[ConversationMessage]
-
-class ConversationResponse(BaseModel):
-    """The complete response structure for conversation generation"""
-    explanation: str
-    conversations: List[Conversation]
-
 @contextmanager
-def session_scope():
+def session_scope(**session_kwargs):
     """Provide a transactional scope around a series of operations."""
-    session = DBSession()
+    session = DBSession(**session_kwargs)
     try:
         yield session
         session.commit()
     except Exception as e:
-        logger.error(f"Database error in session scope: {str(e)}")
+        logger.error("Database error in session scope: %s", e)
         session.rollback()
         raise
     finally:
@@ -183,21 +509,55 @@ class SalesPromptExtractorAgent(BaseAgent):
         self.parameters = SALES_PROMPT_PARAMETERS
         super().__init__(session=session, **kwargs)
         
-        # Initialize dependent agents
-        self.transcription_agent = TranscriptionAgent(session)
-        self.summarize_agent = SummarizeVideoAgent(session)
-        
-        # Initialize LLMs and vector store
-        self.llm = get_default_llm()
-        self.analysis_llm = kwargs.get('analysis_llm') or OpenAI(OpenaiConfig())
+        # Dependent agents and LLM clients are created on first use (see the
+        # cached properties below); cache hits never touch most of them
+        self._analysis_llm_override = kwargs.get('analysis_llm')
         self.vector_store = SupabaseVectorStore()
         self.max_retries = 3
         self.retry_delay = 2  # seconds
-        self.voice_prompt_agent = VoicePromptGenerationAgent(session)
-        self.structured_data_agent = StructuredDataAgent(session)
-        self.yaml_config_agent = YAMLConfigurationAgent(session)
+        self._last_push = 0.0
+        # The transcription agent publishes progress on this session's one
+        # output message, so concurrent transcript fetches take turns using it
+        self._transcription_lock = threading.Lock()
+        self._analysis_dir = os.path.join(os.getcwd(), 'analysis')
+        os.makedirs(self._analysis_dir, exist_ok=True)
         self.logger = logger  # Initialize logger
-        self.sales_tool = SalesAnalysisTool(api_key=self.llm.api_key)
+
+    @cached_property
+    def _prompt_cache(self) -> AnalysisCache:
+        return _shared_prompt_cache()
+
+    @cached_property
+    def transcription_agent(self) -> TranscriptionAgent:
+        return TranscriptionAgent(self.session)
+
+    @cached_property
+    def summarize_agent(self) -> SummarizeVideoAgent:
+        return SummarizeVideoAgent(self.session)
+
+    @cached_property
+    def voice_prompt_agent(self) -> VoicePromptGenerationAgent:
+        return VoicePromptGenerationAgent(self.session)
+
+    @cached_property
+    def structured_data_agent(self) -> StructuredDataAgent:
+        return StructuredDataAgent(self.session)
+
+    @cached_property
+    def yaml_config_agent(self) -> YAMLConfigurationAgent:
+        return YAMLConfigurationAgent(self.session)
+
+    @cached_property
+    def llm(self):
+        return get_default_llm()
+
+    @cached_property
+    def analysis_llm(self):
+        return self._analysis_llm_override or OpenAI(OpenaiConfig())
+
+    @cached_property
+    def sales_tool(self) -> SalesAnalysisTool:
+        return SalesAnalysisTool(api_key=self.llm.api_key)
         
     def _get_db_session(self):
         """Get a new database session for thread-safe operations"""
@@ -248,63 +608,29 @@ class SalesPromptExtractorAgent(BaseAgent):
 
     def _get_analysis_prompt(self, transcript: str, analysis_type: str) -> List[Dict[str, str]]:
         """Generate appropriate prompt based on analysis type"""
-        try:
-            logger.info("=== Generating Analysis Prompt ===")
-            messages = [
-                {
-                    "role": "system",
-                    "content": """You are an expert sales analyst. Your task is to analyze sales conversations and provide clear, actionable insights.
-Your analysis must include:
-1. A clear summary of the video content and key takeaways
-2. Specific sales techniques with examples from the transcript
-3. Communication strategies with actual phrases used
-4. Objection handling approaches demonstrated
-5. Voice agent guidelines based on successful patterns
-
-Provide your response in a structured format with:
-- A detailed markdown analysis
-- Structured data about sales techniques and metrics
-- A voice prompt that incorporates the successful patterns identified
-
-The voice prompt MUST be a concise, actionable prompt that guides an AI agent in replicating the successful techniques identified. 
-Format it as a direct instruction to the AI, starting with a greeting and including key approaches to use.
-
-IMPORTANT: Your response MUST include all three components:
-1. analysis (string): Detailed markdown analysis
-2. structured_data (object): Structured data about techniques and metrics
-3. voice_prompt (string): A concise, actionable prompt starting with "Hello!" and including specific instructions
-
-Example voice prompt format:
-"Hello! In your conversations, ensure to [key approach 1]. When customers [situation], respond with [technique]. Always maintain [style] and focus on [objective]. Thank you!"
-"""
-                },
-                {
-                    "role": "user",
-                    "content": f"""Analyze this sales conversation transcript and provide detailed insights:
+        return [
+            {"role": "system", "content": _SALES_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Analyze this sales conversation transcript and provide detailed insights:\n\n{transcript}"}
+        ]
 
-{transcript}"""
-                }
-            ]
-            logger.info("Analysis prompt generated successfully")
-            return messages
-        except Exception as e:
-            logger.error(f"Error generating analysis prompt: {str(e)}", exc_info=True)
-            raise
+    def _store_analysis_output(self, video_id: str, collection_id: str, analysis_text: str) -> str:
+        """Store the analysis text in Supabase and return its analysis id"""
+        self.vector_store.store_generated_output(
+            video_id=video_id,
+            collection_id=collection_id,
+            output_type="analysis",
+            content=analysis_text,
+            metadata={
+                "collection_id": collection_id
+            }
+        )
+        return f"analysis_{video_id}"
 
     def _store_analysis_response(self, video_id: str, collection_id: str, analysis_text: str) -> str:
         """Store analysis response in Supabase"""
         try:
             # Store analysis output
-            analysis_id = f"analysis_{video_id}"
-            self.vector_store.store_generated_output(
-                video_id=video_id,
-                collection_id=collection_id,
-                output_type="analysis",
-                content=analysis_text,
-                metadata={
-                    "collection_id": collection_id
-                }
-            )
+            analysis_id = self._store_analysis_output(video_id, collection_id, analysis_text)
             
             # Format next steps
             next_steps = self._format_next_steps(analysis_id, video_id)
@@ -317,68 +643,44 @@ Example voice prompt format:
             return analysis_id
             
         except Exception as e:
-            logger.error(f"Error storing analysis response: {str(e)}")
+            logger.error("Error storing analysis response: %s", e)
             raise
 
     def _save_markdown_analysis(self, analysis_content: str, structured_data: Dict, voice_prompt: str, yaml_config: Dict, video_id: str) -> str:
         """Save the analysis as a markdown file."""
         try:
-            # Create analysis directory if it doesn't exist
-            analysis_dir = os.path.join(os.getcwd(), 'analysis')
-            os.makedirs(analysis_dir, exist_ok=True)
-            
             # Create filename with timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            timestamp = time.strftime(_FILENAME_TIMESTAMP_FORMAT)
             filename = f'analysis_{video_id}_{timestamp}.md'
-            filepath = os.path.join(analysis_dir, filename)
+            filepath = os.path.join(self._analysis_dir, filename)
             
-            # Format content
-            markdown_content = f"""# Sales Conversation Analysis
-
-## Raw Analysis
-{analysis_content}
-
-## YAML Configuration
-```yaml
-{yaml_config}
-```
-
-## Voice Agent Prompt
-```
-{voice_prompt}
-```
-
-## Structured Data
-```json
-{json.dumps(structured_data, indent=2)}
-```
-"""
-            
-            # Write to file
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
-                
-            logger.info(f"Analysis saved to markdown file: {filepath}")
+            # Render and write in the background; the path is known up front
+            future = _WRITE_POOL.submit(
+                _write_markdown_analysis, filepath,
+                analysis_content, structured_data, voice_prompt, yaml_config
+            )
+            future.add_done_callback(_log_markdown_write)
             return filepath
             
         except Exception as e:
-            logger.error(f"Error saving markdown analysis: {str(e)}", exc_info=True)
+            logger.error("Error saving markdown analysis: %s", e, exc_info=True)
             return None
 
     def _delete_existing_analysis(self, video_id: str, collection_id: str) -> None:
         """Delete existing analysis for the given video and collection."""
         try:
             with session_scope() as db_session:
-                existing = db_session.query(Analysis).filter(
-                    Analysis.video_id == video_id,
-                    Analysis.collection_id == collection_id
-                ).first()
+                existing = db_session.scalar(
+                    select(Analysis).where(
+                        Analysis.video_id == video_id,
+                        Analysis.collection_id == collection_id
+                    ).limit(1)
+                )
                 if existing:
                     db_session.delete(existing)
-                    db_session.commit()
-                    logger.info(f"Deleted existing analysis for video {video_id}")
+                    logger.info("Deleted existing analysis for video %s", video_id)
         except Exception as e:
-            logger.error(f"Error deleting existing analysis: {str(e)}", exc_info=True)
+            logger.error("Error deleting existing analysis: %s", e, exc_info=True)
             raise
 
     def _process_long_transcript(self, transcript: str, video_id: str, collection_id: str) -> str:
@@ -390,7 +692,7 @@ Example voice prompt format:
             # If error is not due to duplicate transcript, raise it
             if "'code': '23505'" not in str(e) and "duplicate key value" not in str(e):
                 raise
-            logger.info(f"Transcript already exists in Supabase for video {video_id}")
+            logger.info("Transcript already exists in Supabase for video %s", video_id)
         
         # Define key aspects to search for
         key_aspects = [
@@ -461,10 +763,7 @@ Output your extracted training data as a series of examples, each enclosed in <e
         examples = []
         
         # Extract examples using regex
-        pattern = r'<example>\s*<input>(.*?)</input>\s*<output>(.*?)</output>\s*</example>'
-        matches = re.finditer(pattern, response, re.DOTALL)
-        
-        for match in matches:
+        for match in _TRAINING_EXAMPLE_RE.finditer(response):
             input_text = match.group(1).strip()
             output_text = match.group(2).strip()
             examples.append({
@@ -505,7 +804,7 @@ Output your extracted training data as a series of examples, each enclosed in <e
             
             return examples
         except Exception as e:
-            logger.error(f"Error extracting training data: {str(e)}", exc_info=True)
+            logger.error("Error extracting training data: %s", e, exc_info=True)
             return []
 
     def _generate_few_shot_examples(self, transcript: str) -> List[Dict]:
@@ -571,7 +870,7 @@ Create 5-8 diverse examples that cover different sales techniques and situations
             
             return examples
         except Exception as e:
-            logger.error(f"Error generating few-shot examples: {str(e)}", exc_info=True)
+            logger.error("Error generating few-shot examples: %s", e, exc_info=True)
             return []
 
     def _parse_few_shot_examples(self, response: str) -> List[Dict]:
@@ -579,10 +878,7 @@ Create 5-8 diverse examples that cover different sales techniques and situations
         examples = []
         
         # Extract examples using regex
-        pattern = r'<example>\s*<context>(.*?)</context>\s*<input>(.*?)</input>\s*<response>(.*?)</response>\s*<reasoning>(.*?)</reasoning>\s*</example>'
-        matches = re.finditer(pattern, response, re.DOTALL)
-        
-        for match in matches:
+        for match in _FEW_SHOT_EXAMPLE_RE.finditer(response):
             examples.append({
                 "context": match.group(1).strip(),
                 "input": match.group(2).strip(),
@@ -592,55 +888,135 @@ Create 5-8 diverse examples that cover different sales techniques and situations
         
         return examples
 
-    def _analyze_content(self, transcript: str) -> dict:
+    def _fit_transcript(self, transcript: str, text_content: SalesAnalysisContent, video_id: str, collection_id: str) -> str:
+        """Tokenize the transcript once and bring it within the analysis context budget.
+
+        Oversized transcripts are condensed chunk by chunk (map-reduce), falling
+        back to their most relevant chunks via vector search; plain token
+        truncation is the last resort.
+        """
+        tokenizer = self.vector_store.tokenizer
+        tokens = tokenizer.encode(transcript)
+        text_content.transcript_tokens = len(tokens)
+        if len(tokens) <= MAX_TRANSCRIPT_TOKENS:
+            return transcript
+
+        logger.warning("Transcript has %s tokens, above the %s token budget", len(tokens), MAX_TRANSCRIPT_TOKENS)
+        for condense in (
+            lambda: self._map_reduce_transcript(tokens, tokenizer),
+            lambda: self._process_long_transcript(transcript, video_id, collection_id),
+        ):
+            try:
+                condensed = condense()
+                condensed_tokens = tokenizer.encode(condensed) if condensed else []
+                if condensed_tokens:
+                    logger.info("Condensed transcript to %s tokens", len(condensed_tokens))
+                    if len(condensed_tokens) <= MAX_TRANSCRIPT_TOKENS:
+                        return condensed
+                    tokens = condensed_tokens
+            except Exception as e:
+                logger.warning("Failed to condense long transcript: %s", e)
+
+        return tokenizer.decode(tokens[:MAX_TRANSCRIPT_TOKENS])
+
+    def _map_reduce_transcript(self, tokens: List[int], tokenizer) -> str:
+        """Condense overlapping transcript chunks in parallel and join the highlights in order"""
+        step = MAP_CHUNK_TOKENS - MAP_CHUNK_OVERLAP
+        chunks = [
+            tokenizer.decode(tokens[start:start + MAP_CHUNK_TOKENS])
+            for start in range(0, len(tokens), step)
+        ]
+        logger.info("Condensing transcript in %s chunks", len(chunks))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAP_WORKERS, thread_name_prefix="sales-map") as executor:
+            highlights = list(executor.map(self.sales_tool.extract_highlights, chunks))
+
+        return "\n\n".join(
+            f"Part {index} of {len(chunks)}:\n{text.strip()}"
+            for index, text in enumerate(highlights, 1)
+            if text.strip()
+        )
+
+    def _throttled_push(self, progress: float) -> None:
+        """Push progress, dropping intermediate updates that arrive within PUSH_MIN_INTERVAL"""
+        now = time.monotonic()
+        if progress in (0.0, 1.0) or now - self._last_push >= PUSH_MIN_INTERVAL:
+            self.output_message.push_update(progress=progress)
+            self._last_push = now
+
+    def _report_analysis_progress(self, received: int, max_tokens: int) -> None:
+        """Push streamed-token progress for the running analysis"""
+        self._throttled_push(round(min(received / max_tokens, 0.95), 2))
+
+    def _partial_text_reporter(self, text_content: TextContent) -> Callable[[str], None]:
+        """Build an on_text callback that shows the streamed analysis in text_content.
+
+        The text is only set here; the progress push that follows each callback
+        stores it with the rest of the message.
+        """
+        def report(partial: str) -> None:
+            if len(partial) > MAX_STREAMED_TEXT_CHARS:
+                partial = partial[:MAX_STREAMED_TEXT_CHARS] + "\n\n[truncated]"
+            text_content.text = partial
+        return report
+
+    def _format_analysis_result(self, result: AnalysisResult, training_data: List[Dict], few_shot_examples: List[Dict]) -> dict:
+        """Assemble the markdown analysis and result payload for an AnalysisResult"""
+        # Format the result for response
+        analysis = "".join((
+            "## Analysis\n```markdown\n",
+            result.raw_analysis,
+            "\n```",
+            # Structured data section
+            "\n\n## Structured Data\n```json\n",
+            fast_json.dumps_pretty(result.structured_data),
+            "\n```\n",
+            # Voice prompt section with few-shot examples
+            "\n\n## Voice Prompt\n```\n",
+            result.voice_prompt,
+            "\n\n### Few-Shot Learning Examples:\n",
+            yaml.dump({"few_shot_examples": few_shot_examples}, default_flow_style=False, sort_keys=False),
+            "\n```\n",
+            # Training data section
+            "\n\n## Training Data\n```json\n",
+            fast_json.dumps_pretty(training_data),
+            "\n```\n",
+        ))
+
+        return {
+            "analysis": analysis,
+            "structured_data": result.structured_data,
+            "voice_prompt": result.voice_prompt,
+            "training_data": training_data,
+            "few_shot_examples": few_shot_examples
+        }
+
+    def _analyze_content(self, transcript: str, text_content: Optional[TextContent] = None) -> dict:
         """Analyze content using the consolidated SalesAnalysisTool"""
         try:
             logger.info("Starting content analysis")
             
-            # Use the consolidated tool
-            result = self.sales_tool.analyze_conversation(transcript)
+            result = self.sales_tool.analyze_conversation(
+                transcript,
+                on_progress=self._report_analysis_progress,
+                on_text=self._partial_text_reporter(text_content) if text_content else None
+            )
             if not result:
                 logger.error("Failed to analyze conversation")
                 return None
-            
-            # Extract training data
-            training_data = self._extract_training_data(transcript)
-            
-            # Generate few-shot examples
-            few_shot_examples = self._generate_few_shot_examples(transcript)
-            
-            # Format the result for response
-            analysis = "## Analysis\n```markdown\n"
-            analysis += result.raw_analysis
-            analysis += "\n```"
-
-            # Add structured data section
-            analysis += "\n\n## Structured Data\n```json\n"
-            analysis += json.dumps(result.structured_data, indent=2)
-            analysis += "\n```\n"
-
-            # Add voice prompt section with few-shot examples
-            analysis += "\n\n## Voice Prompt\n```\n"
-            analysis += result.voice_prompt
-            analysis += "\n\n### Few-Shot Learning Examples:\n"
-            analysis += yaml.dump({"few_shot_examples": few_shot_examples}, default_flow_style=False, sort_keys=False)
-            analysis += "\n```\n"
-            
-            # Add training data section
-            analysis += "\n\n## Training Data\n```json\n"
-            analysis += json.dumps(training_data, indent=2)
-            analysis += "\n```\n"
-                
-            return {
-                "analysis": analysis,
-                "structured_data": result.structured_data,
-                "voice_prompt": result.voice_prompt,
-                "training_data": training_data,
-                "few_shot_examples": few_shot_examples
-            }
+
+            # Training data and few-shot examples are only worth paying for once the
+            # analysis succeeded; they depend on the transcript alone, so run them
+            # concurrently
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="sales-llm") as executor:
+                training_future = executor.submit(self._extract_training_data, transcript)
+                few_shot_future = executor.submit(self._generate_few_shot_examples, transcript)
+                training_data = training_future.result()
+                few_shot_examples = few_shot_future.result()
+
+            return self._format_analysis_result(result, training_data, few_shot_examples)
                 
         except Exception as e:
-            logger.error(f"Error in content analysis: {str(e)}", exc_info=True)
+            logger.error("Error in content analysis: %s", e, exc_info=True)
             raise
 
     def run(
@@ -651,13 +1027,21 @@ Create 5-8 diverse examples that cover different sales techniques and situations
         **kwargs
     ) -> AgentResponse:
         """Run the sales prompt extraction process"""
+        batch_video_ids = kwargs.get("batch_video_ids")
+        if batch_video_ids or kwargs.get("batch_id"):
+            return self.run_batch(
+                jobs=[{"video_id": batch_video_id, "collection_id": collection_id} for batch_video_id in batch_video_ids or []],
+                batch_id=kwargs.get("batch_id"),
+                analysis_type=kwargs.get("analysis_type", "full")
+            )
+
         try:
             # Initialize response content
             text_content = SalesAnalysisContent()
             text_content.text = "Starting sales prompt extraction..."
             text_content.status = MsgStatus.progress
+            # add_content pushes the message
             self.output_message.add_content(text_content)
-            self.output_message.push_update()
 
             # Validate required parameters
             if not video_id or not collection_id:
@@ -672,23 +1056,34 @@ Create 5-8 diverse examples that cover different sales techniques and situations
                     data={"error": "video_id and collection_id are required"}
                 )
 
-            # Get transcript
-            transcript = self._get_transcript(video_id, collection_id)
-            if not transcript:
-                text_content.status = MsgStatus.error
-                text_content.status_message = "Failed to get transcript"
-                text_content.text = "Error: Failed to get transcript"
-                return AgentResponse(
-                    status=AgentStatus.ERROR,
-                    message="Failed to get transcript",
-                    data={"error": "transcript_not_found"}
+            # Concurrent runs for the same video share one analysis
+            analysis_type = kwargs.get("analysis_type", "full")
+            key = (video_id, collection_id, analysis_type)
+            with _INFLIGHT_LOCK:
+                leader = _INFLIGHT_RUNS.get(key)
+                if leader is None:
+                    flight = _INFLIGHT_RUNS[key] = concurrent.futures.Future()
+            if leader is not None:
+                logger.info("Analysis for video %s already running, waiting for its result", video_id)
+                response, leader_content = leader.result()
+                return self._apply_shared_response(text_content, leader_content, response)
+
+            try:
+                response = self._run_analysis(
+                    video_id, collection_id, text_content, analysis_type,
+                    retry_failed=kwargs.get("retry_failed", False)
                 )
-
-            # Process new analysis directly
-            return self._process_new_analysis(transcript, Analysis(video_id=video_id, collection_id=collection_id), text_content)
+                flight.set_result((response, text_content))
+                return response
+            except BaseException as e:
+                flight.set_exception(e)
+                raise
+            finally:
+                with _INFLIGHT_LOCK:
+                    _INFLIGHT_RUNS.pop(key, None)
 
         except Exception as e:
-            logger.error(f"Error in sales prompt extraction: {str(e)}")
+            logger.error("Error in sales prompt extraction: %s", e)
             text_content.text = f"Failed to complete analysis: {str(e)}"
             text_content.status = MsgStatus.error
             text_content.status_message = str(e)
@@ -698,100 +1093,260 @@ Create 5-8 diverse examples that cover different sales techniques and situations
                 data={"error": str(e)}
             )
 
-    def _format_output(self, content: str) -> str:
-        """Format the analysis output for better readability."""
+    def run_batch(self, jobs: Optional[List[Dict[str, str]]] = None, batch_id: Optional[str] = None, analysis_type: str = "full") -> AgentResponse:
+        """Analyze a backlog of videos through the OpenAI Batch API without waiting on it.
+
+        Called with jobs, this fetches and fits each transcript, serves
+        analysis-cache hits directly and submits the rest as one batch. Each
+        submitted video's analysis row is marked batch_pending with the batch
+        id. Called with that batch_id, it checks the batch once and stores
+        the results if the batch has finished. Training data and few-shot
+        examples are not generated in this mode.
+
+        Args:
+            jobs: Dicts with video_id and collection_id
+            batch_id: Batch submitted by an earlier call, to collect
+            analysis_type: Analysis type used for the cache lookup
+
+        Returns:
+            AgentResponse whose data holds the batch id and each job's result
+            or error, keyed by "collection_id:video_id"
+        """
+        text_content = SalesAnalysisContent()
+        text_content.status = MsgStatus.progress
+        if batch_id:
+            text_content.text = f"Checking analysis batch {batch_id}..."
+        else:
+            text_content.text = f"Preparing batch analysis of {len(jobs or [])} videos..."
+        self.output_message.add_content(text_content)
+
         try:
-            # Clean and normalize the content
-            content = content.strip()
-            content = re.sub(r'\n{3,}', '\n\n', content)  # Remove excessive newlines
-            content = _clean_text_for_logging(content)
-            return content
+            if batch_id:
+                response = self._collect_batch(batch_id)
+            else:
+                response = self._submit_batch(jobs or [], text_content, analysis_type)
         except Exception as e:
-            logger.error(f"Error formatting output: {str(e)}", exc_info=True)
-            return content
-
-    def _get_system_prompt(self, analysis_data: dict) -> str:
-        """Generate system prompt for the AI voice agent."""
-        prompt = """You are an AI sales agent trained to engage in natural, empathetic, and effective sales conversations. Your responses should be guided by the following framework:
+            logger.error("Error in batch analysis: %s", e, exc_info=True)
+            response = AgentResponse(
+                status=AgentStatus.ERROR,
+                message=f"Batch analysis failed: {str(e)}",
+                data={"error": str(e), "batch_id": batch_id}
+            )
 
-ROLE AND PERSONA:
-- You are a professional, friendly, and knowledgeable sales consultant
-- You focus on understanding customer needs before proposing solutions
-- You maintain a balanced approach between being helpful and goal-oriented
+        text_content.text = response.message
+        text_content.status_message = response.message
+        text_content.status = MsgStatus.error if response.status == AgentStatus.ERROR else MsgStatus.success
+        self.output_message.push_update()
+        return response
+
+    def _submit_batch(self, jobs: List[Dict[str, str]], text_content: SalesAnalysisContent, analysis_type: str) -> AgentResponse:
+        """Fetch and fit the jobs' transcripts and submit the uncached ones as one batch"""
+        unique_jobs = {_batch_key(job.get("video_id"), job.get("collection_id")): job for job in jobs}
+        results: Dict[str, Dict] = {}
+        transcripts: Dict[str, str] = {}
+        fitted_transcripts: Dict[str, str] = {}
+
+        # Transcript lookups are independent round trips (SQLite, Supabase or
+        # the transcription agent), so fetch them together
+        with concurrent.futures.ThreadPoolExecutor(max_workers=TRANSCRIPT_FETCH_WORKERS, thread_name_prefix="sales-fetch") as executor:
+            fetches = {
+                key: executor.submit(self._get_transcript, job.get("video_id"), job.get("collection_id"))
+                for key, job in unique_jobs.items()
+            }
+        for key, fetch in fetches.items():
+            job = unique_jobs[key]
+            try:
+                transcript = fetch.result()
+            except Exception as e:
+                results[key] = {"error": str(e)}
+                continue
+            if not transcript:
+                results[key] = {"error": "transcript_not_found"}
+                continue
+            fitted = self._fit_transcript(transcript, text_content, job["video_id"], job["collection_id"])
+            cached = self._prompt_cache.get(fitted, analysis_type)
+            if cached:
+                results[key] = cached
+                continue
+            transcripts[key] = transcript
+            fitted_transcripts[key] = fitted
+
+        if not fitted_transcripts:
+            failed = sum(1 for result in results.values() if "error" in result)
+            return AgentResponse(
+                status=AgentStatus.ERROR if results and failed == len(results) else AgentStatus.SUCCESS,
+                message=f"Nothing to submit: {len(results) - failed} videos served from cache, {failed} failed",
+                data={"batch_id": None, "pending": [], "results": results}
+            )
 
-COMMUNICATION STYLE:
-- Use clear, concise, and professional language
-- Practice active listening and ask clarifying questions
-- Mirror the customer's communication style while maintaining professionalism
-- Show genuine interest in helping customers solve their problems
+        text_content.text = f"Submitting batch analysis of {len(fitted_transcripts)} videos..."
+        self.output_message.push_update()
+        batch_id = self.sales_tool.submit_batch(fitted_transcripts)
+        self._mark_batch_pending(batch_id, unique_jobs, transcripts, fitted_transcripts, analysis_type)
+
+        return AgentResponse(
+            status=AgentStatus.SUCCESS,
+            message=(
+                f"Submitted analysis batch {batch_id} for {len(fitted_transcripts)} videos. "
+                f"Run again with batch_id={batch_id} to collect the results."
+            ),
+            data={"batch_id": batch_id, "pending": list(fitted_transcripts), "results": results}
+        )
 
-KEY OBJECTIVES:
-1. Build trust and rapport with customers
-2. Understand customer needs through effective questioning
-3. Present relevant solutions based on customer requirements
-4. Address concerns and objections professionally
-5. Guide conversations toward positive outcomes
+    def _mark_batch_pending(self, batch_id: str, jobs: Dict[str, Dict[str, str]], transcripts: Dict[str, str], fitted_transcripts: Dict[str, str], analysis_type: str) -> None:
+        """Record the batch on each submitted video's analysis row so it can be collected later"""
+        try:
+            with session_scope() as db_session:
+                for key in fitted_transcripts:
+                    video_id, collection_id = jobs[key]["video_id"], jobs[key]["collection_id"]
+                    analysis = db_session.scalar(
+                        select(Analysis).where(
+                            Analysis.video_id == video_id,
+                            Analysis.collection_id == collection_id
+                        ).limit(1)
+                    )
+                    if analysis is None:
+                        analysis = Analysis(video_id=video_id, collection_id=collection_id, transcript=transcripts[key])
+                        db_session.add(analysis)
+                    meta_data = {k: v for k, v in (analysis.meta_data or {}).items() if k not in ("error", "retryable")}
+                    meta_data.update(
+                        batch_id=batch_id,
+                        analysis_type=analysis_type,
+                        # The analysis cache is keyed on the transcript that was
+                        # analyzed, which is only the stored one when it fit as is
+                        cache_transcript=fitted_transcripts[key] == transcripts[key]
+                    )
+                    analysis.status = 'batch_pending'
+                    analysis.meta_data = meta_data
+        except Exception:
+            logger.error("Could not record analysis batch %s; collect it manually", batch_id)
+            raise
 
-ETHICAL GUIDELINES:
-1. Always be truthful and transparent
-2. Never pressure customers into decisions
-3. Respect customer privacy and confidentiality
-4. Only make promises you can keep
-5. Prioritize customer needs over immediate sales
+    def _collect_batch(self, batch_id: str) -> AgentResponse:
+        """Store the results of a finished batch on the videos waiting for it"""
+        batch_results = self.sales_tool.collect_batch(batch_id)
+        if batch_results is None:
+            return AgentResponse(
+                status=AgentStatus.SUCCESS,
+                message=f"Analysis batch {batch_id} is still running. Check again later.",
+                data={"batch_id": batch_id, "status": "pending"}
+            )
 
-AVAILABLE TECHNIQUES AND STRATEGIES:
+        with session_scope(expire_on_commit=False) as db_session:
+            waiting = [
+                analysis for analysis in db_session.scalars(
+                    select(Analysis).where(Analysis.status == 'batch_pending')
+                )
+                if (analysis.meta_data or {}).get("batch_id") == batch_id
+            ]
 
-Sales Techniques:
-{techniques}
+        results: Dict[str, Dict] = {}
+        for analysis in waiting:
+            key = _batch_key(analysis.video_id, analysis.collection_id)
+            result = batch_results.get(key)
+            if result is None:
+                # Failed or expired requests can be resubmitted in a new batch
+                self._set_analysis_status(analysis.video_id, analysis.collection_id, 'error', error="Batch analysis failed")
+                results[key] = {"error": "analysis_failed"}
+                continue
+
+            analysis_result = self._format_analysis_result(result, [], [])
+            try:
+                self._store_analysis_output(analysis.video_id, analysis.collection_id, analysis_result["analysis"])
+            except Exception as e:
+                logger.warning("Failed to store batch analysis for video %s: %s", analysis.video_id, e)
+            if analysis.meta_data.get("cache_transcript"):
+                _WRITE_POOL.submit(
+                    self._prompt_cache.set, analysis.transcript,
+                    analysis.meta_data.get("analysis_type", "full"), analysis_result
+                ).add_done_callback(_log_cache_write)
+            self._set_analysis_status(analysis.video_id, analysis.collection_id, 'success')
+            results[key] = analysis_result
+
+        failed = sum(1 for result in results.values() if "error" in result)
+        return AgentResponse(
+            status=AgentStatus.ERROR if results and failed == len(results) else AgentStatus.SUCCESS,
+            message=f"Analysis batch {batch_id} finished: {len(results) - failed} succeeded, {failed} failed",
+            data={"batch_id": batch_id, "status": "completed", "results": results}
+        )
 
-Communication Strategies:
-{strategies}
+    def _run_analysis(self, video_id: str, collection_id: str, text_content: SalesAnalysisContent, analysis_type: str, retry_failed: bool = False) -> AgentResponse:
+        """Go through the stored analysis for this video when there is one, otherwise analyze it"""
+        analysis = self._find_analysis(video_id, collection_id)
+        if analysis is not None:
+            return self._process_existing_analysis(analysis, text_content, analysis_type, retry_failed)
+        return self._analyze_video(video_id, collection_id, text_content, analysis_type)
+
+    def _analyze_video(self, video_id: str, collection_id: str, text_content: SalesAnalysisContent, analysis_type: str) -> AgentResponse:
+        """Fetch and fit the transcript, then analyze it"""
+        transcript = self._get_transcript(video_id, collection_id)
+        if not transcript:
+            text_content.status = MsgStatus.error
+            text_content.status_message = "Failed to get transcript"
+            text_content.text = "Error: Failed to get transcript"
+            return AgentResponse(
+                status=AgentStatus.ERROR,
+                message="Failed to get transcript",
+                data={"error": "transcript_not_found"}
+            )
 
-Objection Handling:
-{objections}
+        transcript = self._fit_transcript(transcript, text_content, video_id, collection_id)
 
-Voice Agent Guidelines:
-{guidelines}
+        # Process new analysis directly
+        return self._process_new_analysis(
+            transcript,
+            Analysis(video_id=video_id, collection_id=collection_id),
+            text_content,
+            analysis_type=analysis_type
+        )
 
-IMPLEMENTATION GUIDELINES:
-1. Start conversations by building rapport and understanding needs
-2. Use appropriate sales techniques based on the conversation context
-3. Address objections using the provided strategies
-4. Apply closing techniques naturally when customer shows interest
-5. Maintain a helpful and consultative approach throughout
+    def _apply_shared_response(self, text_content: SalesAnalysisContent, leader_content: SalesAnalysisContent, response: AgentResponse) -> AgentResponse:
+        """Show the result of a coalesced run in this caller's message"""
+        # Copy every field, so both callers end with identical content
+        for name in type(leader_content).model_fields:
+            setattr(text_content, name, getattr(leader_content, name))
+        self.output_message.push_update()
+        return response
 
-Remember to stay natural and conversational while implementing these guidelines."""
+    def _format_output(self, content: str) -> str:
+        """Format the analysis output for better readability."""
+        try:
+            # Normalize arrows and collapse excessive newlines. The content is
+            # returned to callers, not logged, so it keeps its Unicode;
+            # stdout is already reconfigured to UTF-8 for log output.
+            return _NEWLINES_RE.sub('\n\n', content.strip().translate(_ARROW_TRANSLATION))
+        except Exception as e:
+            logger.error("Error formatting output: %s", e)
+            return content
 
-        # Format techniques section
-        techniques = "\n".join([
-            f"- {t.get('description', '')}"
-            for t in analysis_data.get("sales_techniques", [])
-        ])
-        
-        # Format strategies section
-        strategies = "\n".join([
-            f"- {s.get('type', 'Strategy')}: {s.get('description', '')}"
-            for s in analysis_data.get("communication_strategies", [])
-        ])
-        
-        # Format objections section
-        objections = "\n".join([
-            f"- {o.get('description', '')}"
-            for o in analysis_data.get("objection_handling", [])
-        ])
-        
-        # Format guidelines section
-        guidelines = "\n".join([
-            f"- {g.get('description', '')}"
-            for g in analysis_data.get("voice_agent_guidelines", [])
-        ])
-        
-        return prompt.format(
-            techniques=techniques or "No specific techniques provided",
-            strategies=strategies or "No specific strategies provided",
-            objections=objections or "No specific objection handling provided",
-            guidelines=guidelines or "No specific guidelines provided"
+    def _get_system_prompt(self, analysis_data: dict) -> str:
+        """Generate system prompt for the AI voice agent."""
+        if not any(analysis_data.get(key) for key in _VOICE_AGENT_SECTIONS):
+            return _DEFAULT_VOICE_AGENT_PROMPT
+        return "".join(self._iter_system_prompt(analysis_data))
+
+    def _iter_system_prompt(self, analysis_data: dict) -> Iterator[str]:
+        """Yield the voice agent prompt piece by piece for a single join"""
+        get = analysis_data.get
+        segs = _VOICE_AGENT_PROMPT_SEGS
+        yield segs[0]
+        yield from _iter_bullets(
+            (f"{t.get('description', '')}" for t in get("sales_techniques") or ()), _NO_TECHNIQUES
         )
+        yield segs[1]
+        yield from _iter_bullets(
+            (f"{s.get('type', 'Strategy')}: {s.get('description', '')}" for s in get("communication_strategies") or ()),
+            _NO_STRATEGIES
+        )
+        yield segs[2]
+        yield from _iter_bullets(
+            (f"{o.get('description', '')}" for o in get("objection_handling") or ()), _NO_OBJECTIONS
+        )
+        yield segs[3]
+        yield from _iter_bullets(
+            (f"{g.get('description', '')}" for g in get("voice_agent_guidelines") or ()), _NO_GUIDELINES
+        )
+        yield segs[4]
 
     def _get_fallback_conversations(self) -> list:
         """Return default fallback conversations if generation fails."""
@@ -822,9 +1377,8 @@ Remember to stay natural and conversational while implementing these guidelines.
         ]
 
     def _generate_structured_output(self, analysis_text: str, voice_prompt: str) -> Dict:
-        """Convert Anthropic analysis into structured data using OpenAI"""
+        """Convert the analysis text into structured data in a single tokenizer pass"""
         try:
-            # Initialize structured data with more comprehensive structure
             structured_data = {
                 "summary": {
                     "overview": "",
@@ -840,241 +1394,135 @@ Remember to stay natural and conversational while implementing these guidelines.
                 "key_phrases": [],
                 "closing_techniques": []
             }
-            
-            # Split analysis into sections using markdown headers
-            sections = re.split(r'\n##? ', analysis_text)
+            overview = []
+            # Multi-line effectiveness/description text is buffered per item and
+            # joined once after the pass
+            item_buffers = []
+            current_buffers = None
             current_section = None
             current_item = None
-            
-            for section in sections:
-                section = section.strip()
-                
-                # Process SUMMARY section
-                if section.startswith("SUMMARY") or "Summary" in section:
-                    current_section = "summary"
-                    lines = section.split("\n")
-                    overview = []
-                    topics = []
-                    objectives = []
-                    approaches = []
-                    
-                    for line in lines[1:]:  # Skip header
-                        line = line.strip()
-                        if line.startswith("•") or line.startswith("-"):
-                            if "topic" in line.lower():
-                                topics.append(line.strip("•- "))
-                            elif "objective" in line.lower():
-                                objectives.append(line.strip("•- "))
-                            elif "approach" in line.lower():
-                                approaches.append(line.strip("•- "))
-                            else:
-                                overview.append(line.strip("•- "))
-                    
-                    structured_data["summary"].update({
-                        "overview": " ".join(overview),
-                        "topics": topics,
-                        "learning_objectives": objectives,
-                        "unique_approaches": approaches
-                    })
-                    continue
-                
-                # Process Sales Techniques
-                elif any(x in section for x in ["Sales Techniques", "SALES TECHNIQUES"]):
-                    current_section = "sales_techniques"
-                    techniques = re.split(r'\n(?=[a-z]\)|\d\.)', section)
-                    
-                    for technique in techniques[1:]:  # Skip header
-                        lines = technique.split("\n")
-                        if not lines:
-                            continue
-                            
-                        name = re.sub(r'^[a-z]\)|^\d\.', '', lines[0]).strip()
-                        description = ""
-                        examples = []
-                        effectiveness = ""
-                        
-                        for line in lines[1:]:
-                            line = line.strip()
-                            if line.startswith("- Quote:") or line.startswith("Example:"):
-                                examples.append(line.split(":", 1)[1].strip().strip('"'))
-                            elif line.startswith("- Effect:") or line.startswith("Effectiveness:"):
-                                effectiveness = line.split(":", 1)[1].strip()
-                            elif line.startswith("-"):
-                                if not description:
-                                    description = line.strip("- ")
-                                else:
-                                    effectiveness += " " + line.strip("- ")
-                        
-                        structured_data["sales_techniques"].append({
-                            "name": name,
-                            "description": description,
-                            "examples": examples,
-                            "effectiveness": effectiveness
-                        })
+            item_style = None
+            guideline_type = None
+            # Resolved once per section title rather than compared on every line
+            bucket = None
+            primary = None
+            is_objection = False
+
+            for match in _SECTION_RE.finditer(analysis_text):
+                kind = _TOKEN_KINDS.get(match.lastgroup, match.lastgroup)
+
+                if kind == "title":
+                    current_section = _section_for_title(match.group("title"))
+                    current_item = item_style = guideline_type = None
+                    bucket = structured_data.get(current_section)
+                    primary = _ITEM_KEYS.get(current_section, _DEFAULT_ITEM_KEYS)[1]
+                    is_objection = current_section == "objection_handling"
                     continue
-                
-                # Process Communication Strategies
-                elif any(x in section for x in ["Communication Strategies", "COMMUNICATION"]):
-                    current_section = "communication_strategies"
-                    strategies = re.split(r'\n(?=[a-z]\)|\d\.)', section)
-                    
-                    for strategy in strategies[1:]:  # Skip header
-                        lines = strategy.split("\n")
-                        if not lines:
-                            continue
-                            
-                        strategy_type = re.sub(r'^[a-z]\)|^\d\.', '', lines[0]).strip()
-                        description = ""
-                        examples = []
-                        effectiveness = ""
-                        
-                        for line in lines[1:]:
-                            line = line.strip()
-                            if line.startswith("- Quote:") or line.startswith("Example:"):
-                                examples.append(line.split(":", 1)[1].strip().strip('"'))
-                            elif line.startswith("- Effect:") or line.startswith("Effectiveness:"):
-                                effectiveness = line.split(":", 1)[1].strip()
-                            elif line.startswith("-"):
-                                if not description:
-                                    description = line.strip("- ")
-                                else:
-                                    effectiveness += " " + line.strip("- ")
-                        
-                        structured_data["communication_strategies"].append({
-                            "type": strategy_type,
-                            "description": description,
-                            "examples": examples,
-                            "effectiveness": effectiveness
-                        })
+                if kind == "heading":
+                    current_section = current_item = item_style = guideline_type = None
                     continue
-                
-                # Process Objection Handling
-                elif any(x in section for x in ["Objection Handling", "OBJECTIONS"]):
-                    current_section = "objection_handling"
-                    objections = re.split(r'\n(?=[a-z]\)|\d\.)', section)
-                    
-                    for objection in objections[1:]:  # Skip header
-                        lines = objection.split("\n")
-                        if not lines:
-                            continue
-                            
-                        objection_text = re.sub(r'^[a-z]\)|^\d\.', '', lines[0]).strip().strip('"')
-                        response = ""
-                        examples = []
-                        effectiveness = ""
-                        
-                        for line in lines[1:]:
-                            line = line.strip()
-                            if line.startswith("Response:"):
-                                response = line.split(":", 1)[1].strip().strip('"')
-                            elif line.startswith("Example:"):
-                                examples.append(line.split(":", 1)[1].strip().strip('"'))
-                            elif line.startswith("- Effect:") or line.startswith("Effectiveness:"):
-                                effectiveness = line.split(":", 1)[1].strip()
-                            elif line.startswith("-"):
-                                if not response:
-                                    response = line.strip("- ")
-                                else:
-                                    effectiveness += " " + line.strip("- ")
-                        
-                        structured_data["objection_handling"].append({
-                            "objection": objection_text,
-                            "response": response,
-                            "examples": examples,
-                            "effectiveness": effectiveness
-                        })
+                if current_section is None:
                     continue
-                
-                # Process Voice Agent Guidelines
-                elif any(x in section for x in ["Voice Agent Guidelines", "GUIDELINES"]):
-                    current_section = "voice_agent_guidelines"
-                    
-                    # Split into Do's and Don'ts sections
-                    do_section = ""
-                    dont_section = ""
-                    
-                    if "DO's:" in section:
-                        parts = section.split("DO's:", 1)
-                        if len(parts) > 1:
-                            do_section = parts[1].split("DON'T's:")[0] if "DON'T's:" in parts[1] else parts[1]
-                    
-                    if "DON'T's:" in section:
-                        dont_section = section.split("DON'T's:", 1)[1]
-                    
-                    # Process Do's
-                    for line in do_section.split("\n"):
-                        if line.strip().startswith("-"):
-                            structured_data["voice_agent_guidelines"].append({
-                                "type": "do",
-                                "description": line.strip("- "),
-                                "context": "Best practice guideline"
-                            })
-                    
-                    # Process Don'ts
-                    for line in dont_section.split("\n"):
-                        if line.strip().startswith("-"):
-                            structured_data["voice_agent_guidelines"].append({
-                                "type": "dont",
-                                "description": line.strip("- "),
-                                "context": "Practice to avoid"
-                            })
+
+                if kind == "field":
+                    content = match.group("value").strip().strip('"')
+                elif kind == "marker":
+                    content = match.group("marker")
+                else:
+                    content = match.group(kind).strip()
+                if not content:
                     continue
-                
-                # Process Closing Techniques
-                elif any(x in section for x in ["Closing", "CLOSING"]):
-                    current_section = "closing_techniques"
-                    techniques = re.split(r'\n(?=[a-z]\)|\d\.)', section)
-                    
-                    for technique in techniques[1:]:  # Skip header
-                        lines = technique.split("\n")
-                        if not lines:
-                            continue
-                            
-                        name = re.sub(r'^[a-z]\)|^\d\.', '', lines[0]).strip()
-                        description = ""
-                        examples = []
-                        
-                        for line in lines[1:]:
-                            line = line.strip()
-                            if line.startswith("Example:") or line.startswith("- Quote:"):
-                                examples.append(line.split(":", 1)[1].strip().strip('"'))
-                            elif line.startswith("-"):
-                                if not description:
-                                    description = line.strip("- ")
-                                else:
-                                    description += " " + line.strip("- ")
-                        
-                        structured_data["closing_techniques"].append({
-                            "name": name,
-                            "description": description,
-                            "examples": examples
+
+                if current_section == "summary":
+                    lowered = content.lower()
+                    if "topic" in lowered:
+                        structured_data["summary"]["topics"].append(content)
+                    elif "objective" in lowered:
+                        structured_data["summary"]["learning_objectives"].append(content)
+                    elif "approach" in lowered:
+                        structured_data["summary"]["unique_approaches"].append(content)
+                    else:
+                        overview.append(content)
+
+                elif current_section == "voice_agent_guidelines":
+                    if kind == "marker":
+                        guideline_type = "dont" if content.lower().startswith("don") else "do"
+                    elif guideline_type and kind in ("bullet", "numbered"):
+                        structured_data["voice_agent_guidelines"].append({
+                            "type": guideline_type,
+                            "description": content,
+                            "context": "Best practice guideline" if guideline_type == "do" else "Practice to avoid"
                         })
-                    continue
-                
-                # Process Script Templates
-                elif "Script Template:" in section:
-                    template = section.split("Script Template:", 1)[1].strip()
-                    context = "Main outbound call script"
-                    if ":" in template:
-                        context, template = template.split(":", 1)
-                    structured_data["script_templates"].append({
-                        "template": template.strip(),
-                        "context": context.strip()
-                    })
-                    continue
-                
-                # Process Key Phrases
-                elif "Key Phrases" in section:
-                    for line in section.split("\n"):
-                        if line.strip().startswith("-"):
-                            phrase = line.strip("- ").strip('"')
-                            if phrase:
-                                structured_data["key_phrases"].append(phrase)
-            
+
+                elif current_section == "key_phrases":
+                    if kind in ("bullet", "numbered"):
+                        phrase = content.strip('"')
+                        if phrase:
+                            structured_data["key_phrases"].append(phrase)
+
+                elif current_section == "script_templates":
+                    line = match.group(0).strip().lstrip("-•* ")
+                    context, sep, template = line.partition(":")
+                    template = template.strip()
+                    if sep and template:
+                        structured_data["script_templates"].append({
+                            "template": template,
+                            "context": context.strip()
+                        })
+                    else:
+                        structured_data["script_templates"].append({
+                            "template": line,
+                            "context": "Main outbound call script"
+                        })
+
+                else:
+                    # Items start on whichever line style opens the first item of the
+                    # section: "a)"/"1." lines, "- " bullets, or "Label:" lines
+                    if kind in ("numbered", "bullet"):
+                        starter = kind
+                    elif kind == "text" and content.endswith(":"):
+                        starter = "label"
+                    else:
+                        starter = None
+                    if starter and item_style is None:
+                        item_style = starter
+
+                    if starter and starter == item_style:
+                        current_item = _new_structured_item(current_section, content.rstrip(":").strip().strip('"'))
+                        bucket.append(current_item)
+                        current_buffers = {}
+                        item_buffers.append((current_item, current_buffers))
+                        continue
+                    if current_item is None:
+                        continue
+
+                    if kind == "field":
+                        field = match.group("field")
+                        if field in ("Effect", "Effectiveness", "When to use") and "effectiveness" in current_item:
+                            current_buffers["effectiveness"] = [content]
+                        elif field == "Response" and is_objection:
+                            current_item["response"] = content
+                        elif field == "Customer" and is_objection and not current_item["objection"]:
+                            current_item["objection"] = content
+                        else:
+                            current_item["examples"].append(content)
+                        continue
+
+                    if not current_item[primary]:
+                        current_item[primary] = content
+                    elif "effectiveness" in current_item:
+                        current_buffers.setdefault("effectiveness", []).append(content)
+                    else:
+                        current_buffers.setdefault("description", [current_item["description"]]).append(content)
+
+            for item, buffers in item_buffers:
+                for key, parts in buffers.items():
+                    item[key] = " ".join(parts)
+            structured_data["summary"]["overview"] = " ".join(overview)
             return structured_data
-            
+
         except Exception as e:
-            logger.error(f"Error generating structured output: {str(e)}", exc_info=True)
+            logger.error("Error generating structured output: %s", e, exc_info=True)
             return {
                 "summary": {"overview": "", "topics": [], "learning_objectives": [], "unique_approaches": []},
                 "sales_techniques": [],
@@ -1156,13 +1604,15 @@ Remember to stay natural and conversational while implementing these guidelines.
         
         # Extract from objection handling
         for objection in analysis_data.get("objection_handling", []):
-            if objection.get("effectiveness"):
-                if "success" in objection["effectiveness"].lower() or "positive" in objection["effectiveness"].lower():
+            effectiveness = objection.get("effectiveness")
+            if effectiveness:
+                lowered = effectiveness.lower()
+                if "success" in lowered or "positive" in lowered:
                     markers["conversion_points"].append({
                         "context": "objection_handled",
                         "trigger": objection.get("objection", ""),
                         "response": objection.get("response", ""),
-                        "effectiveness": objection["effectiveness"]
+                        "effectiveness": effectiveness
                     })
             else:
                 markers["risk_factors"].append({
@@ -1196,25 +1646,26 @@ Remember to stay natural and conversational while implementing these guidelines.
         standard_path = {
             "type": "standard",
             "stages": [
-                {"name": "opening", "techniques": []},
-                {"name": "discovery", "techniques": []},
-                {"name": "solution", "techniques": []},
-                {"name": "closing", "techniques": []}
+                {"name": "opening", "title": "Opening", "techniques": []},
+                {"name": "discovery", "title": "Discovery", "techniques": []},
+                {"name": "solution", "title": "Solution", "techniques": []},
+                {"name": "closing", "title": "Closing", "techniques": []}
             ],
             "transitions": []
         }
         
         # Map techniques to stages
+        opening, discovery, solution, closing = (stage["techniques"] for stage in standard_path["stages"])
         for technique in analysis_data.get("sales_techniques", []):
             technique_name = technique["name"].lower()
-            if any(x in technique_name for x in ["open", "greet", "introduction"]):
-                standard_path["stages"][0]["techniques"].append(technique)
-            elif any(x in technique_name for x in ["question", "discover", "probe"]):
-                standard_path["stages"][1]["techniques"].append(technique)
-            elif any(x in technique_name for x in ["present", "solution", "value"]):
-                standard_path["stages"][2]["techniques"].append(technique)
-            elif any(x in technique_name for x in ["close", "commit", "next steps"]):
-                standard_path["stages"][3]["techniques"].append(technique)
+            if any(x in technique_name for x in ("open", "greet", "introduction")):
+                opening.append(technique)
+            elif any(x in technique_name for x in ("question", "discover", "probe")):
+                discovery.append(technique)
+            elif any(x in technique_name for x in ("present", "solution", "value")):
+                solution.append(technique)
+            elif any(x in technique_name for x in ("close", "commit", "next steps")):
+                closing.append(technique)
         
         pathways.append(standard_path)
         
@@ -1243,59 +1694,62 @@ Remember to stay natural and conversational while implementing these guidelines.
 
     def _generate_voice_prompt(self, analysis_text: str) -> str:
         """Generate voice prompt from analysis"""
-        try:
-            # Try to parse analysis_text as JSON if it's a string
-            if isinstance(analysis_text, str):
-                try:
-                    analysis_data = json.loads(analysis_text)
-                except json.JSONDecodeError:
-                    # If not valid JSON, extract key information from the text
-                    analysis_data = self._extract_analysis_data(analysis_text)
-            else:
-                analysis_data = analysis_text
+        # Try to parse analysis_text as JSON if it's a string
+        if isinstance(analysis_text, str):
+            try:
+                analysis_data = fast_json.loads(analysis_text)
+            except json.JSONDecodeError:
+                # If not valid JSON, extract key information from the text
+                analysis_data = self._extract_analysis_data(analysis_text)
+        else:
+            analysis_data = analysis_text
+
+        if not isinstance(analysis_data, dict):
+            logger.error("Error generating voice prompt: expected a mapping, got %s", type(analysis_data).__name__)
+            return "Error generating voice prompt. Please use standard sales conversation practices."
 
-            # Extract components from analysis data
-            sales_techniques = analysis_data.get("sales_techniques", [])
-            communication_strategies = analysis_data.get("communication_strategies", [])
-            objection_handling = analysis_data.get("objection_handling", [])
-            voice_guidelines = analysis_data.get("voice_agent_guidelines", [])
-            
-            # Format the prompt sections
-            prompt_sections = []
-            
-            # Add voice guidelines
-            if voice_guidelines:
-                prompt_sections.append("Voice Agent Guidelines:")
-                for guideline in voice_guidelines:
-                    prompt_sections.append(f"- {guideline}")
-            
-            # Add key communication strategies
-            if communication_strategies:
-                prompt_sections.append("\nKey Communication Approaches:")
-                for strategy in communication_strategies[:3]:  # Limit to top 3
-                    prompt_sections.append(f"- {strategy.get('name', '')}: {strategy.get('description', '')}")
-            
-            # Add objection handling
-            if objection_handling:
-                prompt_sections.append("\nObjection Handling:")
-                for objection in objection_handling[:3]:  # Limit to top 3
+        # Extract components from analysis data. Model output may hold plain
+        # strings where dicts are expected, so every item is type checked below.
+        sales_techniques = _section_items(analysis_data, "sales_techniques")
+        communication_strategies = _section_items(analysis_data, "communication_strategies")
+        objection_handling = _section_items(analysis_data, "objection_handling")
+        voice_guidelines = _section_items(analysis_data, "voice_agent_guidelines")
+        
+        # Format the prompt sections
+        prompt_sections = []
+        
+        # Add voice guidelines
+        if voice_guidelines:
+            prompt_sections.append("Voice Agent Guidelines:")
+            for guideline in voice_guidelines:
+                prompt_sections.append(f"- {guideline}")
+        
+        # Add key communication strategies
+        if communication_strategies:
+            prompt_sections.append("\nKey Communication Approaches:")
+            for strategy in communication_strategies[:3]:  # Limit to top 3
+                prompt_sections.append(_format_named_item(strategy))
+        
+        # Add objection handling
+        if objection_handling:
+            prompt_sections.append("\nObjection Handling:")
+            for objection in objection_handling[:3]:  # Limit to top 3
+                if isinstance(objection, dict):
                     prompt_sections.append(f"- When hearing: {objection.get('objection', '')}")
                     prompt_sections.append(f"  Respond with: {objection.get('response', '')}")
-            
-            # Add sales techniques
-            if sales_techniques:
-                prompt_sections.append("\nKey Sales Techniques:")
-                for technique in sales_techniques[:3]:  # Limit to top 3
-                    prompt_sections.append(f"- {technique.get('name', '')}: {technique.get('description', '')}")
-            
-            # Combine all sections
-            prompt = "\n".join(prompt_sections)
-            
-            return prompt or "Use standard sales conversation practices and maintain a professional, friendly tone."
-            
-        except Exception as e:
-            logger.error(f"Error generating voice prompt: {str(e)}", exc_info=True)
-            return "Error generating voice prompt. Please use standard sales conversation practices."
+                else:
+                    prompt_sections.append(f"- When hearing: {objection}")
+        
+        # Add sales techniques
+        if sales_techniques:
+            prompt_sections.append("\nKey Sales Techniques:")
+            for technique in sales_techniques[:3]:  # Limit to top 3
+                prompt_sections.append(_format_named_item(technique))
+        
+        # Combine all sections
+        prompt = "\n".join(prompt_sections)
+        
+        return prompt or "Use standard sales conversation practices and maintain a professional, friendly tone."
 
     def _extract_analysis_data(self, text: str) -> Dict:
         """Extract structured data from raw analysis text"""
@@ -1306,29 +1760,27 @@ Remember to stay natural and conversational while implementing these guidelines.
             "voice_agent_guidelines": []
         }
         
-        # Extract sections using regex patterns
-        sections = {
-            "sales_techniques": r"(?i)sales\s+techniques?.*?(?=\n\n|$)",
-            "communication_strategies": r"(?i)communication\s+strategies?.*?(?=\n\n|$)",
-            "objection_handling": r"(?i)objection\s+handling.*?(?=\n\n|$)",
-            "voice_agent_guidelines": r"(?i)voice.*?guidelines?.*?(?=\n\n|$)"
-        }
-        
-        for key, pattern in sections.items():
-            matches = re.findall(pattern, text, re.DOTALL)
-            if matches:
-                # Split into bullet points and clean up
-                points = re.split(r'\n\s*[-•*]\s*', matches[0])
-                points = [p.strip() for p in points if p.strip()]
+        # Only the first match of each section is used
+        for key, pattern in _ANALYSIS_DATA_SECTIONS:
+            match = pattern.search(text)
+            if match:
+                # Split into bullet points and clean up, stripping each point once
+                points = [p for p in map(str.strip, _BULLET_SPLIT_RE.split(match.group(0))) if p]
                 
                 if key in ["sales_techniques", "communication_strategies"]:
-                    data[key] = [{"name": p.split(':')[0].strip() if ':' in p else p,
-                                "description": p.split(':')[1].strip() if ':' in p else ""} 
-                               for p in points[1:]]  # Skip header
+                    items = []
+                    for p in points[1:]:  # Skip header
+                        name, sep, description = p.partition(':')
+                        items.append({"name": name.strip() if sep else p,
+                                      "description": description.strip()})
+                    data[key] = items
                 elif key == "objection_handling":
-                    data[key] = [{"objection": p.split('Response:')[0].replace('Objection:', '').strip(),
-                                "response": p.split('Response:')[1].strip() if 'Response:' in p else ""}
-                               for p in points[1:]]  # Skip header
+                    items = []
+                    for p in points[1:]:  # Skip header
+                        objection, _, response = p.partition('Response:')
+                        items.append({"objection": objection.replace('Objection:', '').strip(),
+                                      "response": response.strip()})
+                    data[key] = items
                 else:
                     data[key] = points[1:]  # Skip header
         
@@ -1336,128 +1788,128 @@ Remember to stay natural and conversational while implementing these guidelines.
 
     def _format_behavioral_patterns(self, patterns: Dict) -> str:
         """Format behavioral patterns into prompt section"""
-        formatted = "Key Interaction Patterns:\n"
+        parts = ["Key Interaction Patterns:\n"]
         
         # Add customer signals
         if patterns["customer_signals"]:
-            formatted += "\nCustomer Signal Patterns:\n"
+            parts.append("\nCustomer Signal Patterns:\n")
             for signal in patterns["customer_signals"][:3]:  # Limit to top 3
-                formatted += f"- When: {signal['signal']}\n  Response: {signal['response_type']}\n"
+                parts.append(f"- When: {signal['signal']}\n  Response: {signal['response_type']}\n")
         
         # Add agent responses
         if patterns["agent_responses"]:
-            formatted += "\nProven Response Patterns:\n"
+            parts.append("\nProven Response Patterns:\n")
             for response in patterns["agent_responses"][:3]:  # Limit to top 3
-                formatted += f"- Context: {response['context']}\n  Approaches: {', '.join(response['responses'][:2])}\n"
+                parts.append(f"- Context: {response['context']}\n  Approaches: {', '.join(response['responses'][:2])}\n")
         
-        return formatted
+        return "".join(parts)
 
     def _format_conversation_flows(self, flows: List[Dict]) -> str:
         """Format conversation flows into prompt section"""
-        formatted = "Available Conversation Paths:\n"
+        parts = ["Available Conversation Paths:\n"]
         
         for flow in flows:
             if flow["type"] == "standard":
-                formatted += "\nStandard Path:\n"
+                parts.append("\nStandard Path:\n")
                 for stage in flow["stages"]:
                     if stage["techniques"]:
-                        formatted += f"- {stage['name'].title()}:\n"
+                        parts.append(f"- {stage['title']}:\n")
                         for technique in stage["techniques"][:2]:  # Limit to top 2
-                            formatted += f"  * {technique['name']}: {technique['description']}\n"
+                            parts.append(f"  * {technique['name']}: {technique['description']}\n")
             elif flow["type"] == "objection_handling":
-                formatted += "\nObjection Handling Paths:\n"
+                parts.append("\nObjection Handling Paths:\n")
                 for trigger in flow["trigger_points"][:3]:  # Limit to top 3
-                    formatted += f"- On: {trigger['objection']}\n"
+                    parts.append(f"- On: {trigger['objection']}\n")
         
-        return formatted
+        return "".join(parts)
 
     def _format_success_markers(self, markers: Dict) -> str:
         """Format success markers into prompt section"""
-        formatted = "Key Success Indicators:\n"
+        parts = ["Key Success Indicators:\n"]
         
         if markers["positive_indicators"]:
-            formatted += "\nPositive Signals:\n"
+            parts.append("\nPositive Signals:\n")
             for indicator in markers["positive_indicators"][:3]:
-                formatted += f"- {indicator['description']}\n"
+                parts.append(f"- {indicator['description']}\n")
         
         if markers["conversion_points"]:
-            formatted += "\nConversion Triggers:\n"
+            parts.append("\nConversion Triggers:\n")
             for point in markers["conversion_points"][:3]:
-                formatted += f"- When: {point['trigger']}\n  Success Response: {point['response']}\n"
+                parts.append(f"- When: {point['trigger']}\n  Success Response: {point['response']}\n")
         
-        return formatted
+        return "".join(parts)
 
     def _format_adaptation_rules(self, patterns: Dict, markers: Dict) -> str:
         """Format adaptation rules into prompt section"""
-        formatted = "Dynamic Adaptation Guidelines:\n"
+        parts = ["Dynamic Adaptation Guidelines:\n"]
         
         # Add interaction-based rules
         if patterns["interaction_flows"]:
-            formatted += "\nInteraction Adjustments:\n"
+            parts.append("\nInteraction Adjustments:\n")
             for flow in patterns["interaction_flows"][:3]:
-                formatted += f"- When using {flow['type']}:\n  {flow['flow']}\n"
+                parts.append(f"- When using {flow['type']}:\n  {flow['flow']}\n")
         
         # Add success-based rules
         if markers["engagement_signals"]:
-            formatted += "\nEngagement Rules:\n"
+            parts.append("\nEngagement Rules:\n")
             for signal in markers["engagement_signals"][:3]:
-                formatted += f"- {signal['description']}\n"
+                parts.append(f"- {signal['description']}\n")
         
-        return formatted
+        return "".join(parts)
 
     def _format_techniques_for_stage(self, flows: List[Dict], stage: str) -> str:
         """Format techniques for a specific conversation stage"""
-        formatted = ""
+        parts = []
         
         for flow in flows:
             if flow["type"] == "standard":
                 for s in flow["stages"]:
                     if s["name"] == stage and s["techniques"]:
                         for technique in s["techniques"][:3]:  # Limit to top 3
-                            formatted += f"- {technique['name']}:\n"
-                            formatted += f"  Purpose: {technique['description']}\n"
+                            parts.append(f"- {technique['name']}:\n  Purpose: {technique['description']}\n")
                             if technique.get("examples"):
-                                formatted += f"  Example: {technique['examples'][0]}\n"
+                                parts.append(f"  Example: {technique['examples'][0]}\n")
         
-        return formatted or "Use standard best practices for this stage"
+        return "".join(parts) or "Use standard best practices for this stage"
 
     def _format_objection_handling(self, flows: List[Dict]) -> str:
         """Format objection handling patterns"""
-        formatted = ""
+        parts = []
         
         for flow in flows:
             if flow["type"] == "objection_handling":
                 for response in flow["responses"][:3]:  # Limit to top 3
-                    formatted += f"- When hearing: {response['objection']}\n"
-                    formatted += f"  Respond with: {response['response']}\n"
+                    parts.append(f"- When hearing: {response['objection']}\n  Respond with: {response['response']}\n")
                     if response.get("effectiveness"):
-                        formatted += f"  Effectiveness: {response['effectiveness']}\n"
+                        parts.append(f"  Effectiveness: {response['effectiveness']}\n")
         
-        return formatted or "Follow standard objection handling practices"
+        return "".join(parts) or "Follow standard objection handling practices"
 
     def _format_customer_signals(self, signals: List[Dict]) -> str:
         """Format customer signals section"""
-        formatted = "Watch for these customer indicators:\n"
+        parts = ["Watch for these customer indicators:\n"]
         
         for signal in signals[:5]:  # Limit to top 5
-            formatted += f"- Signal: {signal['signal']}\n"
-            formatted += f"  Context: {signal['context']}\n"
-            formatted += f"  Response: {signal['response_type']}\n"
+            parts.append(
+                f"- Signal: {signal['signal']}\n"
+                f"  Context: {signal['context']}\n"
+                f"  Response: {signal['response_type']}\n"
+            )
         
-        return formatted
+        return "".join(parts)
 
     def _format_response_patterns(self, patterns: List[Dict]) -> str:
         """Format response patterns section"""
-        formatted = "Proven response patterns:\n"
+        parts = ["Proven response patterns:\n"]
         
         for pattern in patterns[:5]:  # Limit to top 5
-            formatted += f"- Context: {pattern['context']}\n"
+            parts.append(f"- Context: {pattern['context']}\n")
             if pattern["responses"]:
-                formatted += f"  Examples:\n"
+                parts.append("  Examples:\n")
                 for response in pattern["responses"][:2]:
-                    formatted += f"    * {response}\n"
+                    parts.append(f"    * {response}\n")
         
-        return formatted
+        return "".join(parts)
 
     def _get_transcript(self, video_id: str, collection_id: str) -> Optional[str]:
         """Get transcript for the given video ID and store in Supabase if not already stored"""
@@ -1470,32 +1922,37 @@ Remember to stay natural and conversational while implementing these guidelines.
                 logger.error("collection_id is required")
                 raise ValueError("collection_id is required")
 
-            # First check if we have a cached transcript
+            # First check if we have a cached transcript. The session is closed
+            # before the Supabase call so its pooled connection isn't held
+            # across the network round trip.
             with session_scope() as db_session:
-                analysis = db_session.query(Analysis).filter(
-                    Analysis.video_id == video_id,
-                    Analysis.collection_id == collection_id
-                ).first()
-                
-                if analysis and analysis.transcript:
-                    logger.info(f"Found cached transcript for video {video_id}")
-                    # Store in Supabase if not already stored
-                    try:
-                        self.vector_store.store_transcript(analysis.transcript, video_id, collection_id)
-                        logger.info(f"Stored transcript in Supabase for video {video_id}")
-                    except Exception as e:
-                        if "'code': '23505'" in str(e) or "duplicate key value" in str(e):
-                            logger.info(f"Transcript already exists in Supabase for video {video_id}")
-                        else:
-                            logger.warning(f"Failed to store transcript in Supabase: {str(e)}")
-                    return analysis.transcript
+                cached_transcript = db_session.scalar(
+                    select(Analysis.transcript).where(
+                        Analysis.video_id == video_id,
+                        Analysis.collection_id == collection_id
+                    ).limit(1)
+                )
+
+            if cached_transcript:
+                logger.info("Found cached transcript for video %s", video_id)
+                # Store in Supabase if not already stored
+                try:
+                    self.vector_store.store_transcript(cached_transcript, video_id, collection_id)
+                    logger.info("Stored transcript in Supabase for video %s", video_id)
+                except Exception as e:
+                    if "'code': '23505'" in str(e) or "duplicate key value" in str(e):
+                        logger.info("Transcript already exists in Supabase for video %s", video_id)
+                    else:
+                        logger.warning("Failed to store transcript in Supabase: %s", e)
+                return cached_transcript
 
             # If no cached transcript, get it from the transcription agent
-            logger.info(f"Getting transcript for video {video_id} from collection {collection_id}")
-            response = self.transcription_agent.run(
-                video_id=video_id,
-                collection_id=collection_id
-            )
+            logger.info("Getting transcript for video %s from collection %s", video_id, collection_id)
+            with self._transcription_lock:
+                response = self.transcription_agent.run(
+                    video_id=video_id,
+                    collection_id=collection_id
+                )
             
             if response.status == AgentStatus.SUCCESS and response.data.get("transcript"):
                 transcript = response.data["transcript"]
@@ -1509,28 +1966,64 @@ Remember to stay natural and conversational while implementing these guidelines.
                         status="processing"
                     )
                     db_session.add(analysis)
-                    db_session.commit()
                 
                 # Store in Supabase
                 try:
                     self.vector_store.store_transcript(transcript, video_id, collection_id)
-                    logger.info(f"Stored transcript in Supabase for video {video_id}")
+                    logger.info("Stored transcript in Supabase for video %s", video_id)
                 except Exception as e:
                     if "'code': '23505'" in str(e) or "duplicate key value" in str(e):
-                        logger.info(f"Transcript already exists in Supabase for video {video_id}")
+                        logger.info("Transcript already exists in Supabase for video %s", video_id)
                     else:
-                        logger.warning(f"Failed to store transcript in Supabase: {str(e)}")
+                        logger.warning("Failed to store transcript in Supabase: %s", e)
                     
                 return transcript
             else:
-                logger.error(f"Failed to get transcript: {response.message}")
+                logger.error("Failed to get transcript: %s", response.message)
                 return None
 
         except Exception as e:
-            logger.error(f"Error getting transcript: {str(e)}")
+            logger.error("Error getting transcript: %s", e)
             raise
 
-    def _process_existing_analysis(self, analysis: Analysis, text_content: TextContent) -> AgentResponse:
+    def _find_analysis(self, video_id: str, collection_id: str) -> Optional[Analysis]:
+        """Load the stored analysis row for a video, with the outputs read after the session closes"""
+        with session_scope(expire_on_commit=False) as db_session:
+            return db_session.scalar(
+                select(Analysis).where(
+                    Analysis.video_id == video_id,
+                    Analysis.collection_id == collection_id
+                ).options(
+                    selectinload(Analysis.structured_data),
+                    selectinload(Analysis.voice_prompt)
+                ).limit(1)
+            )
+
+    def _set_analysis_status(self, video_id: str, collection_id: str, status: str, error: Optional[str] = None, retryable: bool = True) -> None:
+        """Record the outcome of an analysis run on the stored analysis row.
+
+        Failures keep their error and whether rerunning could help in
+        meta_data; a later success clears both.
+        """
+        try:
+            with session_scope() as db_session:
+                analysis = db_session.scalar(
+                    select(Analysis).where(
+                        Analysis.video_id == video_id,
+                        Analysis.collection_id == collection_id
+                    ).limit(1)
+                )
+                if analysis is None:
+                    return
+                meta_data = {k: v for k, v in (analysis.meta_data or {}).items() if k not in ("error", "retryable")}
+                if error is not None:
+                    meta_data.update(error=error, retryable=retryable)
+                analysis.status = status
+                analysis.meta_data = meta_data
+        except Exception as e:
+            logger.warning("Failed to record analysis status for video %s: %s", video_id, e)
+
+    def _process_existing_analysis(self, analysis: Analysis, text_content: TextContent, analysis_type: str = "full", retry_failed: bool = False) -> AgentResponse:
         """Process an existing analysis"""
         try:
             if analysis.status == 'completed':
@@ -1538,23 +2031,29 @@ Remember to stay natural and conversational while implementing these guidelines.
                 structured_data = {}
                 voice_prompt = ""
                 try:
-                    structured_data_output = self.vector_store.get_generated_output(
-                        video_id=analysis.video_id,
-                        collection_id=analysis.collection_id,
-                        output_type="structured_data"
-                    )
-                    voice_prompt_output = self.vector_store.get_generated_output(
-                        video_id=analysis.video_id,
-                        collection_id=analysis.collection_id,
-                        output_type="voice_prompt"
-                    )
+                    # The two lookups are independent round trips, so overlap them
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="sales-fetch") as executor:
+                        structured_data_future = executor.submit(
+                            self.vector_store.get_generated_output,
+                            video_id=analysis.video_id,
+                            collection_id=analysis.collection_id,
+                            output_type="structured_data"
+                        )
+                        voice_prompt_future = executor.submit(
+                            self.vector_store.get_generated_output,
+                            video_id=analysis.video_id,
+                            collection_id=analysis.collection_id,
+                            output_type="voice_prompt"
+                        )
+                        structured_data_output = structured_data_future.result()
+                        voice_prompt_output = voice_prompt_future.result()
                     
                     if structured_data_output:
-                        structured_data = json.loads(structured_data_output)
+                        structured_data = fast_json.loads(structured_data_output)
                     if voice_prompt_output:
                         voice_prompt = voice_prompt_output
                 except Exception as e:
-                    logger.warning(f"Failed to get outputs from Supabase: {str(e)}")
+                    logger.warning("Failed to get outputs from Supabase: %s", e)
                 
                 # Fallback to SQLite data if Supabase retrieval failed
                 if not structured_data and analysis.structured_data:
@@ -1563,19 +2062,15 @@ Remember to stay natural and conversational while implementing these guidelines.
                     voice_prompt = analysis.voice_prompt.prompt
 
                 # Format complete response with all components
-                complete_response = f"""Here's my detailed analysis:
-
-{analysis.raw_analysis}
-
-STRUCTURED DATA:
-```json
-{json.dumps(structured_data, indent=2)}
-```
-
-VOICE PROMPT:
-```
-{voice_prompt}
-```"""
+                complete_response = "".join((
+                    "Here's my detailed analysis:\n\n",
+                    analysis.raw_analysis or "",
+                    "\n\nSTRUCTURED DATA:\n```json\n",
+                    fast_json.dumps_pretty(structured_data),
+                    "\n```\n\nVOICE PROMPT:\n```\n",
+                    voice_prompt or "",
+                    "\n```",
+                ))
 
                 # Update text content
                 text_content.text = complete_response
@@ -1592,10 +2087,24 @@ VOICE PROMPT:
                     }
                 )
             
+            # A failure marked as not retryable would fail the same way again;
+            # report it instead of fetching the transcript and paying for a rerun
+            meta_data = analysis.meta_data or {}
+            if analysis.status in ('error', 'failed') and not meta_data.get('retryable', True) and not retry_failed:
+                error = meta_data.get('error', 'Previous analysis failed')
+                text_content.text = f"Error processing analysis: {error}"
+                text_content.status = MsgStatus.error
+                text_content.status_message = error
+                return AgentResponse(
+                    status=AgentStatus.ERROR,
+                    message=f"Error processing analysis: {error}",
+                    data={"error": error, "retryable": False}
+                )
+
             # If not completed, treat as new analysis
-            return self._process_new_analysis(self._get_transcript(analysis.video_id, analysis.collection_id), analysis, text_content)
+            return self._analyze_video(analysis.video_id, analysis.collection_id, text_content, analysis_type)
         except Exception as e:
-            logger.error(f"Error processing existing analysis: {str(e)}", exc_info=True)
+            logger.error("Error processing existing analysis: %s", e, exc_info=True)
             # Update text content for error case
             text_content.text = f"Error processing analysis: {str(e)}"
             text_content.status = MsgStatus.error
@@ -1607,12 +2116,26 @@ VOICE PROMPT:
                 data={"error": str(e)}
             )
 
-    def _process_new_analysis(self, transcript: str, analysis: Analysis, text_content: TextContent) -> AgentResponse:
+    def _process_new_analysis(self, transcript: str, analysis: Analysis, text_content: TextContent, analysis_type: str = "full") -> AgentResponse:
         """Process a new analysis"""
         try:
-            # Analyze content
-            analysis_result = self._analyze_content(transcript)
+            # Reuse a cached result for an identical transcript
+            analysis_result = self._prompt_cache.get(transcript, analysis_type)
+            if not analysis_result:
+                analysis_result = self._analyze_content(transcript, text_content)
+                if analysis_result:
+                    # Writing the cache entry is independent of the
+                    # Supabase store below, so let it run alongside
+                    _WRITE_POOL.submit(
+                        self._prompt_cache.set, transcript, analysis_type, analysis_result
+                    ).add_done_callback(_log_cache_write)
             if not analysis_result:
+                # The model answered but nothing usable came back on either
+                # pipeline, so a rerun of the same transcript would too
+                self._set_analysis_status(
+                    analysis.video_id, analysis.collection_id, 'error',
+                    error="Failed to analyze content", retryable=False
+                )
                 text_content.text = "Failed to analyze content"
                 text_content.status = MsgStatus.error
                 text_content.status_message = "Analysis failed"
@@ -1626,21 +2149,24 @@ VOICE PROMPT:
             self.session.video_id = analysis.video_id
             self.session.collection_id = analysis.collection_id
             
-            # Store results
-            self._store_analysis_response(
-                video_id=analysis.video_id,
-                collection_id=analysis.collection_id,
-                analysis_text=analysis_result["analysis"]
-            )
-            
             # Update text content for frontend
             text_content.text = analysis_result["analysis"]
             text_content.structured_data = analysis_result["structured_data"]
             text_content.voice_prompt = analysis_result["voice_prompt"]
             text_content.training_data = analysis_result["training_data"]
+            text_content.few_shot_examples = analysis_result["few_shot_examples"]
             text_content.status = MsgStatus.success
             text_content.status_message = "Analysis completed successfully"
             
+            # Store results. This appends the next steps to the final text and
+            # publishes once, so the message is written with its final state
+            self._store_analysis_response(
+                video_id=analysis.video_id,
+                collection_id=analysis.collection_id,
+                analysis_text=analysis_result["analysis"]
+            )
+            self._set_analysis_status(analysis.video_id, analysis.collection_id, 'success')
+            
             return AgentResponse(
                 status=AgentStatus.SUCCESS,
                 message="Analysis completed successfully",
@@ -1648,7 +2174,9 @@ VOICE PROMPT:
             )
                 
         except Exception as e:
-            logger.error(f"Error processing analysis: {str(e)}")
+            logger.error("Error processing analysis: %s", e)
+            # API and storage errors are transient; the next run may retry
+            self._set_analysis_status(analysis.video_id, analysis.collection_id, 'error', error=str(e))
             text_content.text = f"Error processing analysis: {str(e)}"
             text_content.status = MsgStatus.error
             text_content.status_message = str(e)
@@ -9,6 +9,74 @@ from director.llm.base import LLMResponseStatus
 
 logger = logging.getLogger(__name__)
 
+# Static parts of the voice agent system prompt; only the sections between
+# them are rendered per call
+_PROMPT_HEAD = """You are an AI sales agent trained to engage in natural, empathetic, and effective sales conversations. Your responses should be guided by the following framework:
+
+ROLE AND PERSONA:
+- You are a professional, friendly, and knowledgeable sales consultant
+- You focus on understanding customer needs before proposing solutions
+- You maintain a balanced approach between being helpful and goal-oriented
+
+COMMUNICATION STYLE:
+- Use clear, concise, and professional language
+- Practice active listening and ask clarifying questions
+- Mirror the customer's communication style while maintaining professionalism
+- Show genuine interest in helping customers solve their problems
+
+KEY OBJECTIVES:
+1. Build trust and rapport with customers
+2. Understand customer needs through effective questioning
+3. Present relevant solutions based on customer requirements
+4. Address concerns and objections professionally
+5. Guide conversations toward positive outcomes
+
+ETHICAL GUIDELINES:
+1. Always be truthful and transparent
+2. Never pressure customers into decisions
+3. Respect customer privacy and confidentiality
+4. Only make promises you can keep
+5. Prioritize customer needs over immediate sales
+
+AVAILABLE TECHNIQUES AND STRATEGIES:
+
+Sales Techniques:
+"""
+
+_PROMPT_TAIL = """
+
+IMPLEMENTATION GUIDELINES:
+1. Start conversations by building rapport and understanding needs
+2. Use appropriate sales techniques based on the conversation context
+3. Address objections using the provided strategies
+4. Apply closing techniques naturally when customer shows interest
+5. Maintain a helpful and consultative approach throughout
+
+Remember to stay natural and conversational while implementing these guidelines."""
+
+_PROMPT_SECTION_KEYS = (
+    "sales_techniques",
+    "communication_strategies",
+    "objection_handling",
+    "closing_techniques",
+)
+
+def _render_system_prompt(techniques: str, strategies: str, objections: str, closing: str) -> str:
+    """Fill the voice agent system prompt with pre-rendered sections"""
+    return f"""{_PROMPT_HEAD}{techniques or 'No specific techniques provided'}
+
+Communication Strategies:
+{strategies or 'No specific strategies provided'}
+
+Objection Handling:
+{objections or 'No specific objection handling provided'}
+
+Closing Techniques:
+{closing or 'No specific closing techniques provided'}{_PROMPT_TAIL}"""
+
+# Prompt for analyses with no techniques, rendered once
+_EMPTY_SYSTEM_PROMPT = _render_system_prompt("", "", "", "")
+
 class VoicePromptContent(TextContent):
     """Content type for voice prompt results"""
     prompt_data: Dict = {}
@@ -50,55 +118,8 @@ class SalesVoicePromptAgent(BaseAgent):
 
     def _get_system_prompt(self, analysis_data: dict) -> str:
         """Generate system prompt for the AI voice agent."""
-        prompt = """You are an AI sales agent trained to engage in natural, empathetic, and effective sales conversations. Your responses should be guided by the following framework:
-
-ROLE AND PERSONA:
-- You are a professional, friendly, and knowledgeable sales consultant
-- You focus on understanding customer needs before proposing solutions
-- You maintain a balanced approach between being helpful and goal-oriented
-
-COMMUNICATION STYLE:
-- Use clear, concise, and professional language
-- Practice active listening and ask clarifying questions
-- Mirror the customer's communication style while maintaining professionalism
-- Show genuine interest in helping customers solve their problems
-
-KEY OBJECTIVES:
-1. Build trust and rapport with customers
-2. Understand customer needs through effective questioning
-3. Present relevant solutions based on customer requirements
-4. Address concerns and objections professionally
-5. Guide conversations toward positive outcomes
-
-ETHICAL GUIDELINES:
-1. Always be truthful and transparent
-2. Never pressure customers into decisions
-3. Respect customer privacy and confidentiality
-4. Only make promises you can keep
-5. Prioritize customer needs over immediate sales
-
-AVAILABLE TECHNIQUES AND STRATEGIES:
-
-Sales Techniques:
-{techniques}
-
-Communication Strategies:
-{strategies}
-
-Objection Handling:
-{objections}
-
-Closing Techniques:
-{closing}
-
-IMPLEMENTATION GUIDELINES:
-1. Start conversations by building rapport and understanding needs
-2. Use appropriate sales techniques based on the conversation context
-3. Address objections using the provided strategies
-4. Apply closing techniques naturally when customer shows interest
-5. Maintain a helpful and consultative approach throughout
-
-Remember to stay natural and conversational while implementing these guidelines."""
+        if not any(analysis_data.get(key) for key in _PROMPT_SECTION_KEYS):
+            return _EMPTY_SYSTEM_PROMPT
 
         # Format techniques section
         techniques = "\n".join([
@@ -124,12 +145,7 @@ Remember to stay natural and conversational while implementing these guidelines.
             for c in analysis_data.get("closing_techniques", [])
         ])
         
-        return prompt.format(
-            techniques=techniques or "No specific techniques provided",
-            strategies=strategies or "No specific strategies provided",
-            objections=objections or "No specific objection handling provided",
-            closing=closing or "No specific closing techniques provided"
-        )
+        return _render_system_prompt(techniques, strategies, objections, closing)
 
     def run(
         self,
@@ -180,7 +196,7 @@ Remember to stay natural and conversational while implementing these guidelines.
             )
             
         except Exception as e:
-            logger.error(f"Error generating voice prompts: {str(e)}", exc_info=True)
+            logger.error("Error generating voice prompts: %s", e, exc_info=True)
             if 'text_content' in locals():
                 text_content.status = MsgStatus.error
                 text_content.status_message = f"Failed to generate voice prompts: {str(e)}"
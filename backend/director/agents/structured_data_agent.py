@@ -11,6 +11,50 @@ from director.llm.base import LLMResponseStatus
 
 logger = logging.getLogger(__name__)
 
+_STRUCTURE_SYSTEM_PROMPT = """You are an expert in converting sales analysis and voice prompts into structured YAML data optimized for LLM consumption. Your task is to generate clean, well-organized YAML that captures all key information.
+
+Your output must be valid YAML and should include:
+
+1. METADATA
+- Version information
+- Generation timestamp
+- Data format details
+- Usage guidelines
+
+2. ANALYSIS COMPONENTS
+- Sales techniques with examples
+- Communication patterns
+- Objection handling approaches
+- Success indicators
+
+3. VOICE CHARACTERISTICS
+- Tone parameters
+- Pacing guidelines
+- Adaptation rules
+- Expression patterns
+
+4. IMPLEMENTATION DETAILS
+- Context handling rules
+- Response templates
+- Recovery strategies
+- Quality metrics
+
+5. TRAINING DATA
+- Input-output pairs
+- Context annotations
+- Effectiveness scores
+- Usage examples
+
+FORMAT REQUIREMENTS:
+1. Use clear, consistent key names
+2. Include type information
+3. Provide usage examples
+4. Add descriptive comments
+5. Ensure valid YAML structure
+6. ALWAYS wrap the output in ```yaml code blocks
+
+The output should be immediately usable by other LLMs without additional processing."""
+
 class StructuredContent(TextContent):
     """Content type for structured data results"""
     structured_data: Dict = {}
@@ -65,53 +109,18 @@ class StructuredDataAgent(BaseAgent):
             "description": "Generates structured data from analysis and optional voice prompts"
         }
 
-    def _get_structure_prompt(self, analysis: str, voice_prompt: str, format: str) -> List[Dict[str, str]]:
+    def _get_structure_prompt(self, analysis: str, voice_prompt: str, format: str) -> List[Dict[str, Any]]:
         """Generate appropriate prompt for structured data generation"""
-        system_prompt = """You are an expert in converting sales analysis and voice prompts into structured YAML data optimized for LLM consumption. Your task is to generate clean, well-organized YAML that captures all key information.
-
-Your output must be valid YAML and should include:
-
-1. METADATA
-- Version information
-- Generation timestamp
-- Data format details
-- Usage guidelines
-
-2. ANALYSIS COMPONENTS
-- Sales techniques with examples
-- Communication patterns
-- Objection handling approaches
-- Success indicators
-
-3. VOICE CHARACTERISTICS
-- Tone parameters
-- Pacing guidelines
-- Adaptation rules
-- Expression patterns
-
-4. IMPLEMENTATION DETAILS
-- Context handling rules
-- Response templates
-- Recovery strategies
-- Quality metrics
-
-5. TRAINING DATA
-- Input-output pairs
-- Context annotations
-- Effectiveness scores
-- Usage examples
-
-FORMAT REQUIREMENTS:
-1. Use clear, consistent key names
-2. Include type information
-3. Provide usage examples
-4. Add descriptive comments
-5. Ensure valid YAML structure
-6. ALWAYS wrap the output in ```yaml code blocks
+        # The analysis leads the user turn and ends the cached prefix, so
+        # structuring the same analysis in another format reuses it. Only
+        # the format instructions after it are processed fresh.
+        source = f"""Analysis:
+{analysis}
 
-The output should be immediately usable by other LLMs without additional processing."""
+Voice Prompt:
+{voice_prompt}"""
 
-        user_prompt = f"""Convert this sales analysis and voice prompt into structured {format} format YAML.
+        instructions = f"""Convert this sales analysis and voice prompt into structured {format} format YAML.
 
 The output should:
 1. Capture all key information
@@ -121,12 +130,6 @@ The output should:
 5. Follow YAML best practices
 6. Be wrapped in ```yaml code blocks
 
-Analysis:
-{analysis}
-
-Voice Prompt:
-{voice_prompt}
-
 Remember to:
 - Use consistent formatting
 - Include all relevant data
@@ -135,8 +138,11 @@ Remember to:
 - Wrap output in ```yaml blocks"""
 
         return [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
+            {"role": "system", "content": _STRUCTURE_SYSTEM_PROMPT},
+            {"role": "user", "content": [
+                {"type": "text", "text": source, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": instructions}
+            ]}
         ]
 
     def _find_similar_structures(self) -> List[Dict]:
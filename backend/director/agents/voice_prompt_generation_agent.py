@@ -9,9 +9,51 @@ from director.agents.base import BaseAgent, AgentResponse, AgentStatus
 from director.core.session import TextContent, MsgStatus, OutputMessage, Session
 from director.tools.anthropic_tool import AnthropicTool
 from director.llm.base import LLMResponseStatus
+from director.utils import fast_json
 
 logger = logging.getLogger(__name__)
 
+_JSON_BLOCK_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+
+_VOICE_PROMPT_SYSTEM_PROMPT = """You are an expert voice prompt architect specializing in dynamic AI conversations.
+Your core competencies include:
+1. Sales psychology and conversation dynamics
+2. Voice modulation and emotional resonance
+3. Natural language pattern recognition
+4. Adaptive response strategy design
+
+Your responsibility is to generate voice prompts that are:
+- Contextually aware and situation-specific
+- Emotionally intelligent and empathetic
+- Naturally adaptive to conversation flow
+- Style-consistent throughout interactions
+
+IMPORTANT: Generate prompts that directly instruct the AI on how to handle the specific situation.
+DO NOT use generic greetings or introductions like "Hello!" or "I am an AI assistant."
+Instead, start with clear, actionable guidance for the specific context.
+
+Your output must be in the following JSON format:
+{
+    "prompt": {
+        "content": "Direct situational guidance without greetings (e.g., 'When the customer expresses interest in pricing, acknowledge their focus on value and explain how our solution provides long-term cost benefits. Maintain a confident yet consultative tone.')",
+        "tone_guidance": {
+            "pitch": "Specific pitch guidance for this situation",
+            "rate": "Context-appropriate speech rate",
+            "energy": "Situation-specific energy level"
+        },
+        "adaptation_rules": {
+            "context_triggers": ["Specific situations requiring adaptation"],
+            "response_patterns": ["Contextual response patterns"],
+            "transitions": ["Natural transition phrases for this scenario"]
+        }
+    },
+    "metadata": {
+        "style": "Style used",
+        "context_awareness": ["Specific context elements addressed"],
+        "emotional_resonance": ["Emotional aspects considered"]
+    }
+}"""
+
 class VoicePromptContent(TextContent):
     """Content type for dynamic voice prompt results"""
     prompt_data: Dict = {}
@@ -79,47 +121,8 @@ class VoicePromptGenerationAgent(BaseAgent):
             "description": "Generates dynamic voice prompts based on context and configuration"
         }
 
-    def _get_prompt_template(self, style: str, context: Dict, structured_data: Dict, yaml_config: Dict) -> List[Dict[str, str]]:
+    def _get_prompt_template(self, style: str, context: Dict, structured_data: Dict, yaml_config: Dict) -> List[Dict[str, Any]]:
         """Generate appropriate prompt template based on style, context, and analysis"""
-        system_prompt = """You are an expert voice prompt architect specializing in dynamic AI conversations.
-Your core competencies include:
-1. Sales psychology and conversation dynamics
-2. Voice modulation and emotional resonance
-3. Natural language pattern recognition
-4. Adaptive response strategy design
-
-Your responsibility is to generate voice prompts that are:
-- Contextually aware and situation-specific
-- Emotionally intelligent and empathetic
-- Naturally adaptive to conversation flow
-- Style-consistent throughout interactions
-
-IMPORTANT: Generate prompts that directly instruct the AI on how to handle the specific situation.
-DO NOT use generic greetings or introductions like "Hello!" or "I am an AI assistant."
-Instead, start with clear, actionable guidance for the specific context.
-
-Your output must be in the following JSON format:
-{
-    "prompt": {
-        "content": "Direct situational guidance without greetings (e.g., 'When the customer expresses interest in pricing, acknowledge their focus on value and explain how our solution provides long-term cost benefits. Maintain a confident yet consultative tone.')",
-        "tone_guidance": {
-            "pitch": "Specific pitch guidance for this situation",
-            "rate": "Context-appropriate speech rate",
-            "energy": "Situation-specific energy level"
-        },
-        "adaptation_rules": {
-            "context_triggers": ["Specific situations requiring adaptation"],
-            "response_patterns": ["Contextual response patterns"],
-            "transitions": ["Natural transition phrases for this scenario"]
-        }
-    },
-    "metadata": {
-        "style": "Style used",
-        "context_awareness": ["Specific context elements addressed"],
-        "emotional_resonance": ["Emotional aspects considered"]
-    }
-}"""
-
         # Process structured data insights
         analysis_insights = self._extract_analysis_insights(structured_data)
         
@@ -129,16 +132,19 @@ Your output must be in the following JSON format:
         # Process context analysis
         context_analysis = self._analyze_context(context)
         
-        user_prompt = f"""Generate a {style} voice prompt for this specific situation based on the following analysis and configuration:
+        # The analysis insights lead the user turn and end the cached prefix,
+        # so prompts for other situations reuse them. Style and context
+        # change per call and follow it uncached.
+        insights = f"""ANALYSIS INSIGHTS:
+{fast_json.dumps_pretty(analysis_insights)}"""
 
-ANALYSIS INSIGHTS:
-{json.dumps(analysis_insights, indent=2)}
+        request = f"""Generate a {style} voice prompt for this specific situation based on the analysis insights above and the following configuration:
 
 STYLE CONFIGURATION:
-{json.dumps(style_config, indent=2)}
+{fast_json.dumps_pretty(style_config)}
 
 CONTEXT ANALYSIS:
-{json.dumps(context_analysis, indent=2)}
+{fast_json.dumps_pretty(context_analysis)}
 
 Requirements:
 1. Start with direct, actionable guidance (NO greetings or introductions)
@@ -150,8 +156,11 @@ Requirements:
 The prompt must be specific to the situation while maintaining professional standards and incorporating the analyzed patterns."""
 
         return [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
+            {"role": "system", "content": _VOICE_PROMPT_SYSTEM_PROMPT},
+            {"role": "user", "content": [
+                {"type": "text", "text": insights, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": request}
+            ]}
         ]
 
     def _extract_analysis_insights(self, structured_data: Dict) -> Dict:
@@ -181,7 +190,7 @@ The prompt must be specific to the situation while maintaining professional stan
                 insights["recommended_approaches"] = structured_data["recommendations"]
                 
         except Exception as e:
-            logger.warning(f"Error extracting analysis insights: {str(e)}")
+            logger.warning("Error extracting analysis insights: %s", e)
             
         return insights
 
@@ -269,7 +278,7 @@ The prompt must be specific to the situation while maintaining professional stan
             
             return analysis
         except Exception as e:
-            logger.warning(f"Error analyzing context: {str(e)}")
+            logger.warning("Error analyzing context: %s", e)
             return {}
 
     def _identify_patterns(self, history: List) -> Dict:
@@ -299,7 +308,7 @@ The prompt must be specific to the situation while maintaining professional stan
             
             return patterns
         except Exception as e:
-            logger.warning(f"Error identifying patterns: {str(e)}")
+            logger.warning("Error identifying patterns: %s", e)
             return {}
 
     def _generate_adaptations(self, current_state: Dict, history: List) -> Dict:
@@ -326,7 +335,7 @@ The prompt must be specific to the situation while maintaining professional stan
             
             return adaptations
         except Exception as e:
-            logger.warning(f"Error generating adaptations: {str(e)}")
+            logger.warning("Error generating adaptations: %s", e)
             return {}
 
     def _map_emotion_to_tone(self, emotion: str) -> Dict:
@@ -407,7 +416,7 @@ The prompt must be specific to the situation while maintaining professional stan
             except json.JSONDecodeError:
                 logger.warning("Failed to parse JSON response, attempting extraction")
                 # Try to extract JSON from markdown if present
-                match = re.search(r"```json\n(.*?)\n```", response.content, re.DOTALL)
+                match = _JSON_BLOCK_RE.search(response.content)
                 if match:
                     prompt_data = json.loads(match.group(1))
                 else:
@@ -444,7 +453,7 @@ The prompt must be specific to the situation while maintaining professional stan
             )
             
         except Exception as e:
-            logger.error(f"Error in prompt generation: {str(e)}", exc_info=True)
+            logger.error("Error in prompt generation: %s", e, exc_info=True)
             if 'text_content' in locals():
                 text_content.status = MsgStatus.error
                 text_content.status_message = f"Prompt generation failed: {str(e)}"
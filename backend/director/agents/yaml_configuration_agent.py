@@ -5,16 +5,35 @@ import yaml
 from pydantic import BaseModel
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from director.agents.base import BaseAgent, AgentResponse, AgentStatus
 from director.core.session import TextContent, MsgStatus, OutputMessage, Session
 from director.tools.anthropic_tool import AnthropicTool
 from director.llm.base import LLMResponseStatus
+from director.utils import fast_json
 from director.utils.supabase import SupabaseVectorStore
 from director.llm.openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
+# Aspects of the analysis retrieved from the vector store for long analyses
+_KEY_ASPECTS = (
+    "sales techniques",
+    "communication patterns",
+    "objection handling",
+    "voice characteristics",
+    "behavioral guidelines",
+)
+
+# Header written above every generated config; the timestamp goes between the two halves
+_YAML_HEADER_PREFIX = "# AI Voice Sales Agent Configuration\n# Generated: "
+_YAML_HEADER_SUFFIX = """
+# Purpose: Define voice characteristics, conversation patterns, and behavioral guidelines
+# Version: 1.0
+
+"""
+
 class YAMLContent(TextContent):
     """Content type for YAML configuration results"""
     yaml_data: Dict = {}
@@ -132,7 +151,7 @@ Analysis:
 {analysis}
 
 Structured Data:
-{json.dumps(structured_data, indent=2)}
+{fast_json.dumps_pretty(structured_data)}
 
 Required sections:
 1. metadata
@@ -509,7 +528,7 @@ Analysis:
 {analysis}
 
 Structured Data:
-{json.dumps(structured_data, indent=2)}"""}
+{fast_json.dumps_pretty(structured_data)}"""}
             ]
 
             # Call OpenAI with function calling
@@ -529,15 +548,12 @@ Structured Data:
                 raise Exception("No valid configuration generated")
 
             # Convert to YAML string with proper formatting
-            yaml_str = """# AI Voice Sales Agent Configuration
-# Generated: {timestamp}
-# Purpose: Define voice characteristics, conversation patterns, and behavioral guidelines
-# Version: 1.0
-
-{yaml_content}""".format(
-                timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                yaml_content=yaml.dump(yaml_data, default_flow_style=False, sort_keys=False, allow_unicode=True)
-            )
+            yaml_str = "".join((
+                _YAML_HEADER_PREFIX,
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                _YAML_HEADER_SUFFIX,
+                yaml.dump(yaml_data, default_flow_style=False, sort_keys=False, allow_unicode=True)
+            ))
 
             # Validate the configuration before returning
             self._validate_yaml(yaml_str)
@@ -556,22 +572,21 @@ Structured Data:
             metadata={"type": "sales_analysis"}
         )
         
-        # Search for relevant chunks based on key aspects
-        key_aspects = [
-            "sales techniques",
-            "communication patterns",
-            "objection handling",
-            "voice characteristics",
-            "behavioral guidelines"
-        ]
-        
-        relevant_chunks = []
-        for aspect in key_aspects:
-            chunks = self.vector_store.search_similar_chunks(
+        # Search for relevant chunks based on key aspects. Each search is an
+        # embedding request plus an RPC and they are independent, so run them
+        # together; map keeps the results in aspect order
+        def search(aspect: str) -> List[Dict]:
+            return self.vector_store.search_similar_chunks(
                 f"Find information about {aspect}",
                 limit=2
             )
-            relevant_chunks.extend(chunks)
+
+        with ThreadPoolExecutor(max_workers=len(_KEY_ASPECTS), thread_name_prefix="yaml-search") as executor:
+            relevant_chunks = [
+                chunk
+                for chunks in executor.map(search, _KEY_ASPECTS)
+                for chunk in chunks
+            ]
         
         # Combine relevant chunks
         processed_analysis = "\n\n".join([
@@ -603,9 +618,9 @@ Structured Data:
                 status_message="Starting configuration generation...",
                 text="Processing inputs..."
             )
-            self.output_message.add_content(text_content)
+            # add_content pushes the message, action included
             self.output_message.actions.append("Beginning configuration generation...")
-            self.output_message.push_update()
+            self.output_message.add_content(text_content)
 
             # Process long analysis using vector search
             processed_analysis = self._process_long_analysis(analysis)
@@ -1,6 +1,6 @@
 """Tools module for Director."""
 
-from sqlalchemy import create_engine, Column, Integer, String, JSON, DateTime, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, JSON, DateTime, ForeignKey, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -11,6 +11,10 @@ Base = declarative_base()
 class Analysis(Base):
     """Model for storing raw analysis data"""
     __tablename__ = 'analysis'
+    # Every lookup is by (video_id, collection_id)
+    __table_args__ = (
+        Index('ix_analysis_video_collection', 'video_id', 'collection_id'),
+    )
     
     id = Column(Integer, primary_key=True)
     video_id = Column(String(255), nullable=False)
@@ -67,13 +71,36 @@ class VoicePrompt(Base):
     analysis = relationship("Analysis", back_populates="voice_prompt")
 
 # Database setup
+def _create_engine(db_url):
+    """Create an engine, with the shared connection pool settings for server databases"""
+    if db_url.startswith('sqlite'):
+        # SQLite picks its own pool per URL (a single connection for :memory:)
+        return create_engine(
+            db_url,
+            connect_args={'check_same_thread': False}  # Allow SQLite to be used with multiple threads
+        )
+    return create_engine(
+        db_url,
+        pool_size=20,  # Set a reasonable pool size
+        max_overflow=0,  # Prevent pool overflow
+        pool_pre_ping=True,  # Enable connection health checks
+        pool_recycle=3600  # Recycle connections after 1 hour
+    )
+
+def _create_schema(engine):
+    """Create missing tables, and indexes added to tables that already exist"""
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 def init_db(db_url=None):
     """Initialize database connection"""
     if db_url is None:
         db_url = os.getenv('DATABASE_URL', 'sqlite:///director.db')
     
-    engine = create_engine(db_url)
-    Base.metadata.create_all(engine)  # This will create any missing tables/columns
+    engine = _create_engine(db_url)
+    _create_schema(engine)
     Session.configure(bind=engine)
     return Session
 
@@ -81,13 +108,6 @@ def init_db(db_url=None):
 Session = sessionmaker()
 
 # Initialize the database and bind session on import
-engine = create_engine(
-    os.getenv('DATABASE_URL', 'sqlite:///director.db'),
-    connect_args={'check_same_thread': False},  # Allow SQLite to be used with multiple threads
-    pool_size=20,  # Set a reasonable pool size
-    max_overflow=0,  # Prevent pool overflow
-    pool_pre_ping=True,  # Enable connection health checks
-    pool_recycle=3600  # Recycle connections after 1 hour
-)
-Base.metadata.create_all(engine)
+engine = _create_engine(os.getenv('DATABASE_URL', 'sqlite:///director.db'))
+_create_schema(engine)
 Session.configure(bind=engine) 
\ No newline at end of file
@@ -217,22 +217,21 @@ class OutputMessage(BaseMessage):
 
     def push_update(self, progress: Optional[float] = None):
         """Store the message in the database and update progress."""
-        message_data = self.model_dump()
-        if progress is not None:
-            message_data['metadata'] = {
-                **(message_data.get('metadata') or {}),
-                'progress': progress
-            }
-        self._store_in_db()
+        self._store_in_db({'progress': progress} if progress is not None else None)
 
     def publish(self):
         """Store the message in the database."""
         self._store_in_db()
 
-    def _store_in_db(self):
+    def _store_in_db(self, metadata: Optional[dict] = None):
         """Store the message in the database."""
         try:
             message_data = self.model_dump()
+            if metadata:
+                message_data['metadata'] = {
+                    **(message_data.get('metadata') or {}),
+                    **metadata
+                }
             self.db.add_or_update_msg_to_conv(**message_data)
         except Exception as e:
             logger.error(f"Error storing message in database: {str(e)}")
@@ -3,15 +3,16 @@
 from typing import Any, Dict, List
 import json
 
+from openai import AsyncOpenAI
+
 from .base import BaseEdgeFunction
-from director.utils.openai import OpenAI
 
 class StructuredDataFunction(BaseEdgeFunction):
     """Edge Function for generating structured data from sales conversation analysis."""
 
     def __init__(self, session):
         super().__init__(session)
-        self.openai = OpenAI()
+        self.openai = AsyncOpenAI()
 
     def validate_input(self, input_data: Dict[str, Any]) -> bool:
         """Validate the input data.
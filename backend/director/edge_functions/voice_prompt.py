@@ -1,17 +1,128 @@
-"""Edge Function for generating voice prompts from structured sales data."""
+"""Edge Function for generating voice prompts from structured sales data.
 
-from typing import Any, Dict, List
+Rendering the prompt is pure string assembly over small dicts; its cost is
+object allocation, not arithmetic, so a JIT such as Numba or Cython buys
+nothing here. Keep optimizations aimed at the number of intermediate strings
+(pre-split template, generators joined once).
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List
+import hashlib
 import json
+import re
+
+from anthropic import AsyncAnthropic
 
 from .base import BaseEdgeFunction
-from director.utils.anthropic import Claude
+from director.utils import fast_json
+
+VOICE_PROMPT_MODEL = "claude-3-5-sonnet-20241022"
+
+_VOICE_PROMPT_TEMPLATE = """Based on the following sales conversation analysis, generate a comprehensive voice prompt for an AI agent. 
+The prompt should include specific instructions for voice characteristics, conversation flow, and response patterns.
+
+Format the response as a JSON object with these components:
+
+{
+    "voice_characteristics": {
+        "tone": string,
+        "pace": string,
+        "style": string
+    },
+    "conversation_framework": {
+        "opening": {
+            "approach": string,
+            "key_elements": [string]
+        },
+        "discovery": {
+            "techniques": [string],
+            "adaptations": {
+                "positive_signals": [string],
+                "negative_signals": [string]
+            }
+        },
+        "closing": {
+            "strategies": [string],
+            "transitions": {
+                "success_indicators": [string],
+                "fallback_options": [string]
+            }
+        }
+    },
+    "response_patterns": {
+        "key_phrases": [string],
+        "objection_responses": [{
+            "trigger": string,
+            "response": string,
+            "context": string
+        }],
+        "engagement_cues": [{
+            "cue": string,
+            "action": string
+        }]
+    }
+}
+
+Analysis Data:
+
+Sales Techniques:
+{techniques}
+
+Communication Strategies:{strategies}
+
+Objection Handling:{objections}
+
+Voice Guidelines:{guidelines}"""
+
+# Literal segments between the section placeholders, split once at import
+_TPL_SEGS = tuple(
+    re.split(r"\{(?:techniques|strategies|objections|guidelines)\}", _VOICE_PROMPT_TEMPLATE)
+)
+
+
+# Generated prompts keyed on a digest of the structured data. Generation is an
+# LLM call, and agent workflows often resubmit identical analyses.
+_PROMPT_CACHE: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+_PROMPT_CACHE_SIZE = 256
+
+
+def _structured_data_key(structured_data: Dict[str, Any]) -> bytes:
+    return hashlib.blake2b(fast_json.dumps_bytes(structured_data, sort_keys=True), digest_size=16).digest()
+
+
+def _iter_named_items(items: List[Dict[str, Any]], name_key: str) -> Iterator[str]:
+    """Yield the top three techniques or strategies, labelled by name_key"""
+    for item in items[:3]:
+        get = item.get
+        yield f"\n- {get(name_key)}: {get('description')}"
+        examples = get('examples')
+        if examples:
+            yield f"\n  Example: {examples[0]}"
+
+
+def _iter_objections(objections: List[Dict[str, Any]]) -> Iterator[str]:
+    for objection in objections[:3]:
+        get = objection.get
+        yield f"\n- When hearing: {get('objection')}\n  Respond with: {get('response')}"
+
+
+def _iter_guidelines(guidelines: List[Dict[str, Any]]) -> Iterator[str]:
+    for guideline in guidelines:
+        get = guideline.get
+        label = "Do" if get('type') == 'do' else "Don't"
+        yield f"\n- {label}: {get('description')}"
+        context = get('context')
+        if context:
+            yield f"\n  Context: {context}"
+
 
 class VoicePromptFunction(BaseEdgeFunction):
     """Edge Function for generating voice prompts from structured sales data."""
 
     def __init__(self, session):
         super().__init__(session)
-        self.claude = Claude()
+        self.claude = AsyncAnthropic()
 
     def validate_input(self, input_data: Dict[str, Any]) -> bool:
         """Validate the input data.
@@ -66,7 +177,7 @@ class VoicePromptFunction(BaseEdgeFunction):
                 raise Exception("Failed to store voice prompt")
 
         except Exception as e:
-            self.session.logger.error(f"Error in voice prompt generation: {str(e)}")
+            self.session.logger.error("Error in voice prompt generation: %s", e)
             raise
 
     async def _generate_voice_prompt(self, structured_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -78,16 +189,28 @@ class VoicePromptFunction(BaseEdgeFunction):
         Returns:
             Dict containing voice prompt data
         """
+        key = _structured_data_key(structured_data)
+        cached = _PROMPT_CACHE.get(key)
+        if cached is not None:
+            _PROMPT_CACHE.move_to_end(key)
+            return dict(cached)
+
         prompt = self._generate_prompt_template(structured_data)
         
-        response = await self.claude.complete(
-            prompt=prompt,
+        message = await self.claude.messages.create(
+            model=VOICE_PROMPT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
             max_tokens=2000,
             temperature=0.7
         )
+        response = message.content[0].text
 
         try:
-            return json.loads(response)
+            prompt_data = fast_json.loads(response)
+            _PROMPT_CACHE[key] = prompt_data
+            if len(_PROMPT_CACHE) > _PROMPT_CACHE_SIZE:
+                _PROMPT_CACHE.popitem(last=False)
+            return dict(prompt_data)
         except json.JSONDecodeError:
             self.session.logger.error("Failed to parse Claude response as JSON")
             return {
@@ -95,6 +218,31 @@ class VoicePromptFunction(BaseEdgeFunction):
                 "raw_response": response
             }
 
+    def _iter_prompt_template(self, structured_data: Dict[str, Any]) -> Iterator[str]:
+        """Yield the prompt template piece by piece.
+        
+        Args:
+            structured_data: Structured analysis data
+            
+        Yields:
+            Literal template segments interleaved with rendered section lines
+        """
+        get = structured_data.get
+        techniques = get('sales_techniques') or ()
+        strategies = get('communication_strategies') or ()
+        objections = get('objection_handling') or ()
+        guidelines = get('voice_agent_guidelines') or ()
+
+        yield _TPL_SEGS[0]
+        yield from _iter_named_items(techniques, 'name')
+        yield _TPL_SEGS[1]
+        yield from _iter_named_items(strategies, 'type')
+        yield _TPL_SEGS[2]
+        yield from _iter_objections(objections)
+        yield _TPL_SEGS[3]
+        yield from _iter_guidelines(guidelines)
+        yield _TPL_SEGS[4]
+
     def _generate_prompt_template(self, structured_data: Dict[str, Any]) -> str:
         """Generate the prompt template.
         
@@ -104,81 +252,4 @@ class VoicePromptFunction(BaseEdgeFunction):
         Returns:
             Formatted prompt string
         """
-        # Extract key components
-        techniques = structured_data.get('sales_techniques', [])
-        strategies = structured_data.get('communication_strategies', [])
-        objections = structured_data.get('objection_handling', [])
-        guidelines = structured_data.get('voice_agent_guidelines', [])
-
-        prompt = """Based on the following sales conversation analysis, generate a comprehensive voice prompt for an AI agent. 
-The prompt should include specific instructions for voice characteristics, conversation flow, and response patterns.
-
-Format the response as a JSON object with these components:
-
-{
-    "voice_characteristics": {
-        "tone": string,
-        "pace": string,
-        "style": string
-    },
-    "conversation_framework": {
-        "opening": {
-            "approach": string,
-            "key_elements": [string]
-        },
-        "discovery": {
-            "techniques": [string],
-            "adaptations": {
-                "positive_signals": [string],
-                "negative_signals": [string]
-            }
-        },
-        "closing": {
-            "strategies": [string],
-            "transitions": {
-                "success_indicators": [string],
-                "fallback_options": [string]
-            }
-        }
-    },
-    "response_patterns": {
-        "key_phrases": [string],
-        "objection_responses": [{
-            "trigger": string,
-            "response": string,
-            "context": string
-        }],
-        "engagement_cues": [{
-            "cue": string,
-            "action": string
-        }]
-    }
-}
-
-Analysis Data:
-
-Sales Techniques:
-"""
-        for technique in techniques[:3]:
-            prompt += f"\n- {technique.get('name')}: {technique.get('description')}"
-            if technique.get('examples'):
-                prompt += f"\n  Example: {technique['examples'][0]}"
-
-        prompt += "\n\nCommunication Strategies:"
-        for strategy in strategies[:3]:
-            prompt += f"\n- {strategy.get('type')}: {strategy.get('description')}"
-            if strategy.get('examples'):
-                prompt += f"\n  Example: {strategy['examples'][0]}"
-
-        prompt += "\n\nObjection Handling:"
-        for objection in objections[:3]:
-            prompt += f"\n- When hearing: {objection.get('objection')}"
-            prompt += f"\n  Respond with: {objection.get('response')}"
-
-        prompt += "\n\nVoice Guidelines:"
-        for guideline in guidelines:
-            prompt += f"\n- {'Do' if guideline.get('type') == 'do' else 'Don\'t'}: {guideline.get('description')}"
-            if guideline.get('context'):
-                prompt += f"\n  Context: {guideline['context']}"
-
-        return prompt 
\ No newline at end of file
+        return "".join(self._iter_prompt_template(structured_data))
@@ -6,6 +6,7 @@ Handles all interactions with the Bland AI API for pathway management.
 import os
 import json
 import logging
+from functools import lru_cache
 from typing import Dict, List, Optional, Union
 import requests
 from datetime import datetime
@@ -15,6 +16,36 @@ from director.utils.exceptions import DirectorException
 
 logger = logging.getLogger(__name__)
 
+# Fixed line prefixes for knowledge base text, bound once for the render loops
+_KB_DESCRIPTION = "  Description: "
+_KB_EXAMPLES = "  Examples:"
+_KB_EXAMPLE_BULLET = "    * "
+_KB_EFFECTIVENESS = "  Effectiveness: "
+_KB_RESPONSE = "  Response: "
+
+# Examples are transcript excerpts; embedded line breaks would split a bullet
+_KB_EXAMPLE_TR = str.maketrans({"\r": " ", "\n": " "})
+
+
+def _append_kb_examples(text_content: List[str], examples: List) -> None:
+    """Append an Examples block to the knowledge base lines"""
+    append = text_content.append
+    append(_KB_EXAMPLES)
+    for example in examples:
+        append(_KB_EXAMPLE_BULLET + str(example).translate(_KB_EXAMPLE_TR))
+
+
+@lru_cache(maxsize=512)
+def _render_kb_technique(name: str, description: str, examples: tuple, effectiveness: str) -> str:
+    """Render one sales technique block; playbooks repeat across knowledge base updates"""
+    lines = ["\n- " + name, _KB_DESCRIPTION + description]
+    if examples:
+        _append_kb_examples(lines, examples)
+    if effectiveness:
+        lines.append(_KB_EFFECTIVENESS + effectiveness)
+    return "\n".join(lines)
+
+
 class BlandAIService:
     """Service class for interacting with Bland AI API"""
     
@@ -297,24 +328,20 @@ class BlandAIService:
             if content.get("sales_techniques"):
                 text_content.append("\nSales Techniques:")
                 for technique in content["sales_techniques"]:
-                    text_content.append(f"\n- {technique.get('name', '')}")
-                    text_content.append(f"  Description: {technique.get('description', '')}")
-                    if technique.get('examples'):
-                        text_content.append("  Examples:")
-                        for example in technique['examples']:
-                            text_content.append(f"    * {example}")
-                    if technique.get('effectiveness'):
-                        text_content.append(f"  Effectiveness: {technique['effectiveness']}")
+                    text_content.append(_render_kb_technique(
+                        str(technique.get('name', '')),
+                        str(technique.get('description', '')),
+                        tuple(map(str, technique.get('examples') or ())),
+                        str(technique.get('effectiveness') or '')
+                    ))
             
             if content.get("objection_handling"):
                 text_content.append("\nObjection Handling:")
                 for obj in content["objection_handling"]:
-                    text_content.append(f"\n- Objection: {obj.get('objection', '')}")
-                    text_content.append(f"  Response: {obj.get('response', '')}")
+                    text_content.append("\n- Objection: " + str(obj.get('objection', '')))
+                    text_content.append(_KB_RESPONSE + str(obj.get('response', '')))
                     if obj.get('examples'):
-                        text_content.append("  Examples:")
-                        for example in obj['examples']:
-                            text_content.append(f"    * {example}")
+                        _append_kb_examples(text_content, obj['examples'])
             
             if content.get("training_pairs"):
                 text_content.append("\nTraining Examples:")
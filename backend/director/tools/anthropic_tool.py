@@ -1,13 +1,137 @@
 import os
 import logging
+import threading
 import time
 from typing import Dict, List, Optional, Any
-from anthropic import Anthropic, APITimeoutError, APIError, APIConnectionError
-from tenacity import retry, stop_after_attempt, wait_exponential
+import httpx
+from anthropic import (
+    Anthropic,
+    AsyncAnthropic,
+    APITimeoutError,
+    APIError,
+    APIConnectionError,
+    APIStatusError,
+)
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from director.llm.base import LLMResponse, LLMResponseStatus
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive pool shared by every AnthropicTool using the same key
+CONNECTION_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+RATE_LIMIT_TRIP_AFTER = 5  # consecutive 429 responses before calls fail fast
+RATE_LIMIT_COOLDOWN = 30  # seconds the breaker stays open
+# Slow end of Sonnet's output rate; requests get enough time to generate
+# max_tokens at this rate so long generations aren't cut off and retried
+MIN_OUTPUT_TOKENS_PER_SECOND = 30
+PROMPT_CACHING_BETA = "prompt-caching-2024-07-31"
+# Anthropic ignores cache breakpoints on shorter prefixes. Prefix size is
+# estimated from its length at roughly four characters per token.
+MIN_CACHEABLE_PROMPT_TOKENS = 1024
+APPROX_CHARS_PER_TOKEN = 4
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Only retry transient failures; bad requests and auth errors fail fast"""
+    if isinstance(error, (APITimeoutError, APIConnectionError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+# Exponential backoff with jitter so concurrent callers don't retry in lockstep
+# after a provider 5xx. Coroutines back off with asyncio.sleep.
+_retry_transient = retry(
+    retry=retry_if_exception(_is_retryable),
+    stop=stop_after_attempt(3),
+    wait=wait_exponential_jitter(initial=1, max=60, jitter=0.5),
+    reraise=True
+)
+
+
+class RateLimitCircuitOpen(Exception):
+    """Raised instead of calling the API while the rate limit breaker is open"""
+
+
+class _RateLimitBreaker:
+    """Fail fast for a cooldown after repeated 429s instead of piling on more retries"""
+
+    def __init__(self, trip_after: int, cooldown: float):
+        self.trip_after = trip_after
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+
+    def check(self) -> None:
+        remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            raise RateLimitCircuitOpen(f"Anthropic rate limit breaker open for another {remaining:.0f}s")
+
+    def record(self, error: Optional[BaseException]) -> None:
+        with self._lock:
+            if isinstance(error, APIStatusError) and error.status_code == 429:
+                self._failures += 1
+                if self._failures >= self.trip_after:
+                    self._failures = 0
+                    self._open_until = time.monotonic() + self.cooldown
+                    logger.warning(
+                        "Anthropic rate limited %d times in a row, pausing calls for %ss",
+                        self.trip_after, self.cooldown
+                    )
+            elif error is None:
+                self._failures = 0
+
+
+def _apply_prompt_cache(params: Dict[str, Any]) -> None:
+    """Drop cache breakpoints on prefixes too short to cache; send the caching beta header if any remain"""
+    min_chars = MIN_CACHEABLE_PROMPT_TOKENS * APPROX_CHARS_PER_TOKEN
+    prefix_chars = 0
+    cached = False
+
+    def walk(content: Any) -> Any:
+        nonlocal prefix_chars, cached
+        if isinstance(content, str):
+            prefix_chars += len(content)
+            return content
+        blocks = []
+        for block in content:
+            prefix_chars += len(block.get("text", ""))
+            if "cache_control" in block:
+                if prefix_chars >= min_chars:
+                    cached = True
+                else:
+                    block = {key: value for key, value in block.items() if key != "cache_control"}
+            blocks.append(block)
+        return blocks
+
+    if "system" in params:
+        params["system"] = walk(params["system"])
+    for message in params["messages"]:
+        message["content"] = walk(message["content"])
+    if cached:
+        params["extra_headers"] = {"anthropic-beta": PROMPT_CACHING_BETA}
+
+
+_breaker = _RateLimitBreaker(RATE_LIMIT_TRIP_AFTER, RATE_LIMIT_COOLDOWN)
+_clients: Dict[str, Anthropic] = {}
+_clients_lock = threading.Lock()
+
+
+def _shared_client(api_key: str, timeout: float) -> Anthropic:
+    """Sync client per API key, reused so connections stay warm across tool instances"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = Anthropic(
+                api_key=api_key,
+                timeout=timeout,
+                http_client=httpx.Client(limits=CONNECTION_LIMITS, timeout=timeout)
+            )
+        return client
+
+
 class AnthropicTool:
     """Tool for interacting with Anthropic's Claude API"""
     
@@ -15,15 +139,150 @@ class AnthropicTool:
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY environment variable is not set")
-        self.client = Anthropic(api_key=self.api_key)
         self.model = "claude-3-5-sonnet-20241022"  # Using Claude 3.5 Sonnet
         self.timeout = 120  # 120 seconds timeout
+        self.client = _shared_client(self.api_key, self.timeout)
+        # Async connection pools belong to the event loop that opened them, so
+        # the async client is per instance, built on first use and released
+        # by aclose()
+        self._async_client: Optional[AsyncAnthropic] = None
+
+    @property
+    def async_client(self) -> AsyncAnthropic:
+        if self._async_client is None:
+            self._async_client = AsyncAnthropic(
+                api_key=self.api_key,
+                timeout=self.timeout,
+                http_client=httpx.AsyncClient(limits=CONNECTION_LIMITS, timeout=self.timeout)
+            )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """Close the async client's connection pool, if one was opened"""
+        client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.close()
+
+    def _build_params(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> Dict[str, Any]:
+        """Split out the system message and build the messages.create parameters"""
+        logger.info("=== Starting Anthropic Chat Completion ===")
+        # Payload dumps hold the whole prompt; keep them at DEBUG and lazily
+        # formatted so they cost nothing unless enabled
+        logger.debug("Input messages: %s", messages)
+        logger.info("Temperature: %s", temperature)
+        logger.info("Max tokens: %s", max_tokens)
+
+        system_message = None
+        formatted_messages = []
+
+        for msg in messages:
+            if msg["role"] == "system":
+                system_message = msg["content"]
+            else:
+                formatted_messages.append({
+                    "role": msg["role"],
+                    "content": msg["content"]
+                })
+
+        logger.debug("System message: %s", system_message)
+        logger.debug("Formatted messages: %s", formatted_messages)
+
+        params = {
+            "model": self.model,
+            "messages": formatted_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens if max_tokens else 16384,  # Sonnet max output tokens is 16384
+        }
+
+        if system_message:
+            params["system"] = system_message
+        _apply_prompt_cache(params)
+        params["timeout"] = max(self.timeout, params["max_tokens"] / MIN_OUTPUT_TOKENS_PER_SECOND)
+
+        logger.debug("API parameters: %s", params)
+        return params
+
+    @_retry_transient
+    def _create(self, params: Dict[str, Any]):
+        _breaker.check()
+        try:
+            response = self.client.messages.create(**params)
+        except Exception as e:
+            _breaker.record(e)
+            raise
+        _breaker.record(None)
+        return response
+
+    @_retry_transient
+    async def _acreate(self, params: Dict[str, Any]):
+        _breaker.check()
+        try:
+            response = await self.async_client.messages.create(**params)
+        except Exception as e:
+            _breaker.record(e)
+            raise
+        _breaker.record(None)
+        return response
+
+    def _to_response(self, response: Any, start_time: float) -> LLMResponse:
+        elapsed_time = time.time() - start_time
+        logger.info("API call completed in %.2f seconds", elapsed_time)
+        logger.debug("Response: %s", response)
+
+        return LLMResponse(
+            content=response.content[0].text,
+            send_tokens=response.usage.input_tokens,
+            recv_tokens=response.usage.output_tokens,
+            total_tokens=response.usage.input_tokens + response.usage.output_tokens,
+            finish_reason=response.stop_reason or "stop",
+            status=LLMResponseStatus.SUCCESS
+        )
+
+    def _error_response(self, error: Exception, messages: List[Dict[str, str]], timeout: float) -> LLMResponse:
+        if isinstance(error, RateLimitCircuitOpen):
+            logger.error(str(error))
+            return LLMResponse(
+                content="The analysis service is rate limiting requests. Please try again shortly.",
+                status=LLMResponseStatus.ERROR,
+                finish_reason="rate_limited"
+            )
+        if isinstance(error, APITimeoutError):
+            logger.error("API call timed out after %.0f seconds", timeout)
+            return LLMResponse(
+                content=f"Analysis timed out after {timeout:.0f} seconds. Please try with a shorter video or contact support.",
+                status=LLMResponseStatus.ERROR,
+                finish_reason="timeout"
+            )
+        if isinstance(error, APIConnectionError):
+            logger.error("Connection error: %s", error)
+            return LLMResponse(
+                content="Failed to connect to the analysis service. Please try again later.",
+                status=LLMResponseStatus.ERROR,
+                finish_reason="connection_error"
+            )
+        if isinstance(error, APIError):
+            logger.error("API error: %s", error)
+            return LLMResponse(
+                content=f"Analysis service error: {str(error)}",
+                status=LLMResponseStatus.ERROR,
+                finish_reason="api_error"
+            )
+
+        logger.error("=== Anthropic API Error ===")
+        logger.error("Error type: %s", type(error))
+        logger.error("Error message: %s", error)
+        logger.error("Messages attempted: %s", messages)
+        return LLMResponse(
+            content=f"An unexpected error occurred: {str(error)}",
+            status=LLMResponseStatus.ERROR,
+            finish_reason="error"
+        )
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        reraise=True
-    )
     def chat_completions(
         self,
         messages: List[Dict[str, str]],
@@ -35,7 +294,9 @@ class AnthropicTool:
         Send a chat completion request to Anthropic's Claude
         
         Args:
-            messages: List of message dictionaries with 'role' and 'content'
+            messages: List of message dictionaries with 'role' and 'content'. Content may
+                be a list of text blocks; a block tagged with cache_control marks the end
+                of a prompt prefix to cache.
             temperature: Controls randomness in responses
             max_tokens: Maximum tokens to generate
             **kwargs: Additional arguments to pass to the API
@@ -43,92 +304,46 @@ class AnthropicTool:
         Returns:
             LLMResponse object containing the response
         """
+        params = {}
         try:
-            logger.info("=== Starting Anthropic Chat Completion ===")
-            logger.info(f"Input messages: {messages}")
-            logger.info(f"Temperature: {temperature}")
-            logger.info(f"Max tokens: {max_tokens}")
-            
-            # Extract system message if present
-            system_message = None
-            formatted_messages = []
-            
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_message = msg["content"]
-                else:
-                    formatted_messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
-            
-            logger.info(f"System message: {system_message}")
-            logger.info(f"Formatted messages: {formatted_messages}")
-            
-            # Make the API call with timeout
+            params = self._build_params(messages, temperature, max_tokens)
             logger.info("Making API call to Anthropic...")
             start_time = time.time()
-            
-            try:
-                params = {
-                    "model": self.model,
-                    "messages": formatted_messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens if max_tokens else 16384,  # Sonnet max output tokens is 16384
-                }
-                
-                if system_message:
-                    params["system"] = system_message
-                
-                logger.info(f"API parameters: {params}")
-                response = self.client.messages.create(**params)
-                
-                elapsed_time = time.time() - start_time
-                logger.info(f"API call completed in {elapsed_time:.2f} seconds")
-                logger.info(f"Response: {response}")
-                
-                return LLMResponse(
-                    content=response.content[0].text,
-                    send_tokens=response.usage.input_tokens,
-                    recv_tokens=response.usage.output_tokens,
-                    total_tokens=response.usage.input_tokens + response.usage.output_tokens,
-                    finish_reason=response.stop_reason or "stop",
-                    status=LLMResponseStatus.SUCCESS
-                )
-                
-            except APITimeoutError:
-                logger.error(f"API call timed out after {self.timeout} seconds")
-                return LLMResponse(
-                    content=f"Analysis timed out after {self.timeout} seconds. Please try with a shorter video or contact support.",
-                    status=LLMResponseStatus.ERROR,
-                    finish_reason="timeout"
-                )
-            except APIConnectionError as e:
-                logger.error(f"Connection error: {str(e)}")
-                return LLMResponse(
-                    content="Failed to connect to the analysis service. Please try again later.",
-                    status=LLMResponseStatus.ERROR,
-                    finish_reason="connection_error"
-                )
-            except APIError as e:
-                logger.error(f"API error: {str(e)}")
-                return LLMResponse(
-                    content=f"Analysis service error: {str(e)}",
-                    status=LLMResponseStatus.ERROR,
-                    finish_reason="api_error"
-                )
-            
+            response = self._create(params)
+            return self._to_response(response, start_time)
         except Exception as e:
-            logger.error("=== Anthropic API Error ===")
-            logger.error(f"Error type: {type(e)}")
-            logger.error(f"Error message: {str(e)}")
-            logger.error(f"Messages attempted: {messages}")
-            logger.error(f"System message attempted: {system_message}")
-            return LLMResponse(
-                content=f"An unexpected error occurred: {str(e)}",
-                status=LLMResponseStatus.ERROR,
-                finish_reason="error"
-            )
+            return self._error_response(e, messages, params.get("timeout", self.timeout))
+
+    async def chat_completions_async(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs: Any
+    ) -> LLMResponse:
+        """
+        Async variant of chat_completions; retries back off without blocking the event loop
+
+        Call aclose() once done so the async connection pool is released.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            temperature: Controls randomness in responses
+            max_tokens: Maximum tokens to generate
+            **kwargs: Additional arguments to pass to the API
+
+        Returns:
+            LLMResponse object containing the response
+        """
+        params = {}
+        try:
+            params = self._build_params(messages, temperature, max_tokens)
+            logger.info("Making async API call to Anthropic...")
+            start_time = time.time()
+            response = await self._acreate(params)
+            return self._to_response(response, start_time)
+        except Exception as e:
+            return self._error_response(e, messages, params.get("timeout", self.timeout))
 
     # Alias for backward compatibility
-    chat_completion = chat_completions
\ No newline at end of file
+    chat_completion = chat_completions
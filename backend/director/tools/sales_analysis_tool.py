@@ -1,12 +1,115 @@
 import logging
 import json
-from typing import Dict, List, Optional
+import re
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import OpenAI, OpenAIError
+
+from director.utils import fast_json
 
 logger = logging.getLogger(__name__)
 
+ANALYSIS_MAX_TOKENS = 4000
+# Room for the analysis, structured data and voice prompt the stepwise
+# pipeline budgets separately (4000 + 2000 + 1000); a truncated call falls
+# back to four requests
+COMBINED_MAX_TOKENS = 7000
+# Streamed chunks between progress callbacks; OpenAI sends about one token
+# per chunk, so the chunk count stands in for completion tokens received
+PROGRESS_EVERY_CHUNKS = 500
+# Bump when the analysis prompts or output schema change; cached results
+# produced under another version are ignored
+ANALYSIS_PROMPT_VERSION = "1"
+HIGHLIGHT_MAX_TOKENS = 600  # completion limit per transcript chunk in map-reduce
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+_COMBINED_SYSTEM_PROMPT = """You are an expert sales analyst. Analyze the sales conversation and call emit_sales_analysis with:
+1. analysis: a detailed markdown analysis of the sales techniques, communication strategies, objection handling approaches and voice agent guidelines, with examples
+2. structured_data: the same findings as structured JSON
+3. voice_prompt: a concise, actionable prompt starting with 'Hello!' that guides an AI agent"""
+
+# Opening of the analysis string in the streamed emit_sales_analysis arguments,
+# and the complete characters/escapes that follow it
+_ANALYSIS_FIELD_RE = re.compile(r'"analysis"\s*:\s*"')
+_JSON_STRING_BODY_RE = re.compile(r'(?:[^"\\]|\\(?:u[0-9a-fA-F]{4}|[^u]))*')
+
+
+def _partial_analysis(arguments: str) -> Optional[str]:
+    """Decode the analysis text received so far from partial function-call arguments"""
+    match = _ANALYSIS_FIELD_RE.search(arguments)
+    if not match:
+        return None
+    # The body regex stops before the closing quote or an escape that is
+    # still arriving, so the match is a complete JSON string body
+    body = _JSON_STRING_BODY_RE.match(arguments, match.end()).group()
+    try:
+        return json.loads(f'"{body}"', strict=False)
+    except ValueError:
+        return None
+
+_TECHNIQUE_LIST = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "description": {"type": "string"},
+            "examples": {"type": "array", "items": {"type": "string"}},
+            "effectiveness": {"type": "string"}
+        }
+    }
+}
+
+# Single forced function call that returns all three pipeline outputs at once
+EMIT_ANALYSIS_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "emit_sales_analysis",
+        "description": "Return the markdown analysis, structured data and voice prompt for a sales conversation",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "analysis": {
+                    "type": "string",
+                    "description": "Detailed markdown analysis with sections for sales techniques, communication strategies, objection handling and voice agent guidelines"
+                },
+                "structured_data": {
+                    "type": "object",
+                    "properties": {
+                        "sales_techniques": _TECHNIQUE_LIST,
+                        "communication_strategies": _TECHNIQUE_LIST,
+                        "objection_handling": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "objection": {"type": "string"},
+                                    "response": {"type": "string"},
+                                    "examples": {"type": "array", "items": {"type": "string"}}
+                                }
+                            }
+                        },
+                        "key_metrics": {
+                            "type": "object",
+                            "properties": {
+                                "engagement_level": {"type": "string"},
+                                "communication_clarity": {"type": "string"},
+                                "effectiveness": {"type": "string"}
+                            }
+                        }
+                    }
+                },
+                "voice_prompt": {
+                    "type": "string",
+                    "description": "A concise, actionable voice prompt that starts with 'Hello!' and guides an AI agent in replicating the successful techniques"
+                }
+            },
+            "required": ["analysis", "structured_data", "voice_prompt"]
+        }
+    }
+}
+
 class AnalysisResult(BaseModel):
     """Model for storing analysis results"""
     raw_analysis: str
@@ -16,15 +119,31 @@ class AnalysisResult(BaseModel):
 
 class SalesAnalysisTool:
     """Comprehensive tool for sales conversation analysis"""
+
+    model = "gpt-4-1106-preview"
+    # The combined call deliberately runs on a different model: its single
+    # completion needs COMBINED_MAX_TOKENS, more than the 4096 completion
+    # tokens model allows. metadata["model"] records which one answered.
+    combined_model = "gpt-4o-2024-11-20"
     
     def __init__(self, api_key: str):
         self.client = OpenAI(api_key=api_key)
-        self.model = "gpt-4-1106-preview"
         
-    def generate_analysis(self, transcript: str) -> Optional[str]:
-        """Generate markdown analysis of sales conversation"""
+    def generate_analysis(
+        self,
+        transcript: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """Generate markdown analysis of sales conversation, streaming the completion.
+
+        ``on_progress(received, max_tokens)`` is called every PROGRESS_EVERY_CHUNKS
+        streamed chunks so callers can report real progress while the model writes.
+        ``on_text(partial)`` is called just before it with the markdown received
+        so far, for callers that render the analysis as it arrives.
+        """
         try:
-            response = self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {
@@ -45,13 +164,53 @@ Format your response in clean markdown with clear sections and examples."""
                     }
                 ],
                 temperature=0.7,
-                max_tokens=4000
+                max_tokens=ANALYSIS_MAX_TOKENS,
+                stream=True
             )
-            return response.choices[0].message.content
+            parts = []
+            chunks = 0
+            for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                parts.append(chunk.choices[0].delta.content)
+                chunks += 1
+                if chunks % PROGRESS_EVERY_CHUNKS == 0:
+                    if on_text:
+                        on_text("".join(parts))
+                    if on_progress:
+                        on_progress(chunks, ANALYSIS_MAX_TOKENS)
+            return "".join(parts) or None
+        except OpenAIError:
+            raise
         except Exception as e:
-            logger.error(f"Error generating analysis: {str(e)}")
+            logger.error("Error generating analysis: %s", e)
             return None
 
+    def extract_highlights(self, transcript_chunk: str) -> str:
+        """Condense one transcript chunk to the sales-relevant points and quotes"""
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": """You are an expert sales analyst reading one part of a longer sales call transcript.
+List, as short bullets, the sales techniques, communication strategies, objections and responses, and closing attempts in this part.
+Quote the most effective lines verbatim. Skip small talk and anything not relevant to the sale."""
+                    },
+                    {
+                        "role": "user",
+                        "content": transcript_chunk
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=HIGHLIGHT_MAX_TOKENS
+            )
+            return response.choices[0].message.content or ""
+        except Exception as e:
+            logger.error("Error extracting transcript highlights: %s", e)
+            return ""
+
     def generate_structured_data(self, analysis_text: str) -> Dict:
         """Extract structured data from analysis"""
         try:
@@ -77,7 +236,7 @@ Format your response in clean markdown with clear sections and examples."""
             )
             return json.loads(response.choices[0].message.content)
         except Exception as e:
-            logger.error(f"Error generating structured data: {str(e)}")
+            logger.error("Error generating structured data: %s", e)
             return {}
 
     def generate_voice_prompt(self, analysis_text: str, structured_data: Dict) -> str:
@@ -97,7 +256,7 @@ Include:
                     },
                     {
                         "role": "user",
-                        "content": f"Generate a voice prompt based on this analysis and data:\n\nAnalysis:\n{analysis_text}\n\nStructured Data:\n{json.dumps(structured_data, indent=2)}"
+                        "content": f"Generate a voice prompt based on this analysis and data:\n\nAnalysis:\n{analysis_text}\n\nStructured Data:\n{fast_json.dumps_pretty(structured_data)}"
                     }
                 ],
                 temperature=0.7,
@@ -105,14 +264,184 @@ Include:
             )
             return response.choices[0].message.content
         except Exception as e:
-            logger.error(f"Error generating voice prompt: {str(e)}")
+            logger.error("Error generating voice prompt: %s", e)
             return ""
 
-    def analyze_conversation(self, transcript: str) -> Optional[AnalysisResult]:
-        """Complete analysis pipeline"""
+    def analyze_conversation(
+        self,
+        transcript: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Optional[AnalysisResult]:
+        """Complete analysis pipeline in one request, falling back to the stepwise pipeline.
+
+        The stepwise pipeline only reruns the analysis when the combined output
+        could not be parsed (e.g. it was cut off at COMBINED_MAX_TOKENS). OpenAI
+        API errors are raised rather than retried through it, so None always
+        means the model's output was unusable. ``on_text`` receives the
+        partial markdown analysis from whichever request is streaming it.
+        """
+        result = self.analyze_conversation_combined(transcript, on_progress=on_progress, on_text=on_text)
+        if result:
+            return result
+        logger.info("Falling back to stepwise analysis pipeline")
+        return self.analyze_conversation_stepwise(transcript, on_progress=on_progress, on_text=on_text)
+
+    def _combined_params(self, transcript: str) -> Dict:
+        """Request body for the single forced emit_sales_analysis call"""
+        return {
+            "model": self.combined_model,
+            "messages": [
+                {"role": "system", "content": _COMBINED_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"Analyze this sales conversation transcript:\n\n{transcript}"
+                }
+            ],
+            "tools": [EMIT_ANALYSIS_TOOL],
+            "tool_choice": {"type": "function", "function": {"name": "emit_sales_analysis"}},
+            "temperature": 0.7,
+            "max_tokens": COMBINED_MAX_TOKENS
+        }
+
+    def _result_from_arguments(self, arguments: str) -> Optional[AnalysisResult]:
+        """Build an AnalysisResult from emit_sales_analysis call arguments"""
+        payload = json.loads(arguments)
+        if not payload.get("analysis"):
+            logger.error("Combined analysis returned no analysis text")
+            return None
+
+        return AnalysisResult(
+            raw_analysis=payload["analysis"],
+            structured_data=payload.get("structured_data") or {},
+            voice_prompt=payload.get("voice_prompt") or "",
+            metadata={
+                "timestamp": datetime.now().isoformat(),
+                "model": self.combined_model
+            }
+        )
+
+    def analyze_conversation_combined(
+        self,
+        transcript: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Optional[AnalysisResult]:
+        """Produce analysis, structured data and voice prompt from a single forced function call.
+
+        ``on_text(partial)`` gets the analysis field decoded from the arguments
+        streamed so far, on the same cadence as ``on_progress``. Returns None
+        when the arguments do not parse; API errors are raised to the caller.
+        """
+        logger.info("Running combined analysis on %s", self.combined_model)
+        stream = self.client.chat.completions.create(
+            **self._combined_params(transcript),
+            stream=True
+        )
+        parts = []
+        chunks = 0
+        for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.tool_calls:
+                continue
+            arguments = chunk.choices[0].delta.tool_calls[0].function.arguments
+            if not arguments:
+                continue
+            parts.append(arguments)
+            chunks += 1
+            if chunks % PROGRESS_EVERY_CHUNKS == 0:
+                if on_text:
+                    partial = _partial_analysis("".join(parts))
+                    if partial:
+                        on_text(partial)
+                if on_progress:
+                    on_progress(chunks, COMBINED_MAX_TOKENS)
+
+        try:
+            return self._result_from_arguments("".join(parts))
+        except ValueError as e:
+            logger.error("Could not parse combined analysis: %s", e)
+            return None
+
+    def submit_batch(self, transcripts: Dict[str, str]) -> str:
+        """Queue one combined analysis request per transcript on the OpenAI Batch API.
+
+        Batches are priced at about half of synchronous requests but may take
+        up to the 24h completion window, so this returns the batch id right
+        away; pass it to collect_batch later.
+
+        Args:
+            transcripts: Transcript per caller-chosen custom id
+
+        Returns:
+            The batch id
+        """
+        lines = [
+            fast_json.dumps_bytes({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._combined_params(transcript)
+            })
+            for custom_id, transcript in transcripts.items()
+        ]
+        batch_file = self.client.files.create(
+            file=("sales_analysis_batch.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info("Submitted analysis batch %s with %d requests", batch.id, len(lines))
+        return batch.id
+
+    def collect_batch(self, batch_id: str) -> Optional[Dict[str, AnalysisResult]]:
+        """Check a submitted batch once, without waiting for it.
+
+        Returns None while the batch is still running. Once it has ended,
+        returns the AnalysisResult per custom id; requests that failed or
+        whose output did not parse are left out.
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status not in BATCH_TERMINAL_STATUSES:
+            logger.info("Analysis batch %s is %s", batch_id, batch.status)
+            return None
+
+        results: Dict[str, AnalysisResult] = {}
+        if not batch.output_file_id:
+            logger.error("Analysis batch %s ended with status %s and no output", batch_id, batch.status)
+            return results
+
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            custom_id = record.get("custom_id")
+            try:
+                message = record["response"]["body"]["choices"][0]["message"]
+                result = self._result_from_arguments(message["tool_calls"][0]["function"]["arguments"])
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error("Batch analysis failed for %s: %s", custom_id, e)
+                continue
+            if result:
+                results[custom_id] = result
+        return results
+
+    def analyze_conversation_stepwise(
+        self,
+        transcript: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Optional[AnalysisResult]:
+        """Analysis pipeline as three sequential requests.
+
+        API errors from the analysis request are raised; the structured data
+        and voice prompt steps fall back to empty values.
+        """
         try:
             # Generate raw analysis
-            analysis_text = self.generate_analysis(transcript)
+            analysis_text = self.generate_analysis(transcript, on_progress=on_progress, on_text=on_text)
             if not analysis_text:
                 return None
 
@@ -131,6 +460,8 @@ Include:
                     "model": self.model
                 }
             )
+        except OpenAIError:
+            raise
         except Exception as e:
-            logger.error(f"Error in analysis pipeline: {str(e)}")
-            return None 
\ No newline at end of file
+            logger.error("Error in analysis pipeline: %s", e)
+            return None
@@ -541,11 +541,12 @@ class PathwayTransformer:
         # Only certain nodes should connect to success/rejection ends
         if end_type == NodeType.END_CALL.value:
             # Connect if source is a decision point or final node
-            if "final" in source_node["data"].get("name", "").lower():
+            source_name = source_node["data"].get("name", "").lower()
+            if "final" in source_name:
                 return True
-            if "decision" in source_node["data"].get("name", "").lower():
+            if "decision" in source_name:
                 return True
-            if "booking" in source_node["data"].get("name", "").lower():
+            if "booking" in source_name:
                 return True
                 
         return False
@@ -0,0 +1,126 @@
+"""Local cache for sales analysis results keyed on the transcript."""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, Optional, Tuple
+
+from director.utils import fast_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 7 * 86400  # seconds
+MEMORY_ENTRIES = 32  # in-process entries kept in front of SQLite
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Collapse whitespace so re-wrapped copies of a transcript share a key"""
+    return " ".join(transcript.split())
+
+
+def cache_key(transcript: str, analysis_type: str) -> str:
+    """Content-addressed key for a transcript and analysis type"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(normalize_transcript(transcript).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(analysis_type.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """SQLite backed cache of analysis results.
+
+    Entries are looked up by ``cache_key``, first in a small in-process LRU
+    and then in SQLite. Only an identical transcript (up to whitespace) hits, so a
+    result is never served for another video's conversation.
+
+    ``version`` identifies the prompt and model that produced the results.
+    It is folded into the analysis type, so changing it invalidates every
+    earlier entry.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: int = DEFAULT_TTL,
+        version: str = "",
+    ):
+        self.path = path or os.path.join(os.getcwd(), "analysis", ".cache", "analysis_cache.db")
+        self.ttl = ttl
+        self.version = version
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    analysis_type TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _scope(self, analysis_type: str) -> str:
+        return f"{analysis_type}@{self.version}" if self.version else analysis_type
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        with self._memory_lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            if len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _recall(self, key: str, now: float) -> Optional[str]:
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if not entry or entry[0] <= now:
+                return None
+            self._memory.move_to_end(key)
+            return entry[1]
+
+    def get(self, transcript: str, analysis_type: str) -> Optional[Dict[str, Any]]:
+        """Return a cached analysis result for the transcript, if any"""
+        analysis_type = self._scope(analysis_type)
+        key = cache_key(transcript, analysis_type)
+        now = time.time()
+        cached = self._recall(key, now)
+        if cached is not None:
+            logger.info("Analysis cache hit (memory)")
+            return fast_json.loads(cached)
+
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM analysis_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row:
+                logger.info("Analysis cache hit (exact)")
+                self._remember(key, row[1], row[0])
+                return fast_json.loads(row[0])
+        return None
+
+    def set(self, transcript: str, analysis_type: str, value: Dict[str, Any]) -> None:
+        """Store an analysis result for the transcript"""
+        analysis_type = self._scope(analysis_type)
+        key = cache_key(transcript, analysis_type)
+        payload = fast_json.dumps(value)
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, payload)
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, analysis_type, value, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, analysis_type, payload, expires_at),
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to write analysis cache: %s", e)
@@ -0,0 +1,50 @@
+"""JSON helpers that use orjson when it is installed and fall back to json."""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+    _PRETTY_OPTIONS = _OPTIONS | orjson.OPT_INDENT_2
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """Serialize to compact JSON"""
+    if orjson is not None:
+        options = _OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _OPTIONS
+        return orjson.dumps(obj, default=str, option=options).decode()
+    return json.dumps(obj, default=str, sort_keys=sort_keys)
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+    """Serialize to compact JSON as UTF-8 bytes"""
+    if orjson is not None:
+        options = _OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _OPTIONS
+        return orjson.dumps(obj, default=str, option=options)
+    return json.dumps(obj, default=str, sort_keys=sort_keys).encode("utf-8")
+
+
+def dumps_pretty(obj: Any) -> str:
+    """Serialize to JSON indented by two spaces"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=_PRETTY_OPTIONS).decode()
+    return json.dumps(obj, indent=2, default=str)
+
+
+def dumps_pretty_bytes(obj: Any) -> bytes:
+    """Indented JSON as UTF-8 bytes, without a decode/encode round trip under orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=_PRETTY_OPTIONS)
+    return json.dumps(obj, indent=2, default=str).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,53 @@
+import os
+import unittest
+from unittest.mock import Mock, patch
+
+from director.agents.structured_data_agent import StructuredDataAgent
+from director.agents.voice_prompt_generation_agent import VoicePromptGenerationAgent
+from director.tools.anthropic_tool import PROMPT_CACHING_BETA, AnthropicTool
+
+LONG_ANALYSIS = "The rep opens with situation questions before pricing. " * 100
+
+
+class TestCachedPromptPrefixes(unittest.TestCase):
+    def setUp(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}):
+            self.tool = AnthropicTool()
+
+    def _params(self, messages):
+        return self.tool._build_params(messages, temperature=0.7, max_tokens=100)
+
+    def test_structure_prompt_caches_the_analysis_across_formats(self):
+        agent = StructuredDataAgent(Mock(), structure_llm=Mock())
+        json_params = self._params(agent._get_structure_prompt(LONG_ANALYSIS, "Hello!", "json"))
+        training_params = self._params(agent._get_structure_prompt(LONG_ANALYSIS, "Hello!", "training"))
+
+        cached, instructions = json_params["messages"][0]["content"]
+        self.assertIn(LONG_ANALYSIS, cached["text"])
+        self.assertEqual(cached["cache_control"], {"type": "ephemeral"})
+        self.assertNotIn("cache_control", instructions)
+        self.assertEqual(json_params["extra_headers"], {"anthropic-beta": PROMPT_CACHING_BETA})
+        self.assertEqual(json_params["system"], training_params["system"])
+        self.assertEqual(cached, training_params["messages"][0]["content"][0])
+        self.assertNotEqual(instructions, training_params["messages"][0]["content"][1])
+
+    def test_short_analysis_is_sent_uncached(self):
+        agent = StructuredDataAgent(Mock(), structure_llm=Mock())
+        params = self._params(agent._get_structure_prompt("Short analysis", "", "json"))
+        self.assertNotIn("cache_control", params["messages"][0]["content"][0])
+        self.assertNotIn("extra_headers", params)
+
+    def test_voice_prompt_caches_the_insights_ahead_of_the_context(self):
+        agent = VoicePromptGenerationAgent(Mock(), prompt_llm=Mock())
+        structured_data = {"patterns": [LONG_ANALYSIS]}
+        first = self._params(agent._get_prompt_template("dynamic", {"current_state": {"stage": "pricing"}}, structured_data, {}))
+        second = self._params(agent._get_prompt_template("dynamic", {"current_state": {"stage": "closing"}}, structured_data, {}))
+
+        self.assertEqual(first["messages"][0]["content"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(first["messages"][0]["content"][0], second["messages"][0]["content"][0])
+        self.assertIn("pricing", first["messages"][0]["content"][1]["text"])
+        self.assertEqual(first["extra_headers"], {"anthropic-beta": PROMPT_CACHING_BETA})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from director.utils.analysis_cache import AnalysisCache, cache_key
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cache.db")
+        self.result = {"analysis": "text", "structured_data": {"sales_techniques": []}}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cache_key_ignores_whitespace_only(self):
+        self.assertEqual(
+            cache_key("Hello   World\n", "full"),
+            cache_key("Hello World", "full")
+        )
+        self.assertNotEqual(
+            cache_key("Hello World", "full"),
+            cache_key("hello world", "full")
+        )
+        self.assertNotEqual(
+            cache_key("hello world", "full"),
+            cache_key("hello world", "communication")
+        )
+
+    def test_exact_hit(self):
+        cache = AnalysisCache(path=self.path)
+        self.assertIsNone(cache.get("transcript", "full"))
+        cache.set("transcript", "full", self.result)
+        self.assertEqual(cache.get("transcript", "full"), self.result)
+
+    def test_expired_entry_is_ignored(self):
+        cache = AnalysisCache(path=self.path, ttl=-1)
+        cache.set("transcript", "full", self.result)
+        self.assertIsNone(cache.get("transcript", "full"))
+
+    def test_different_transcript_misses(self):
+        cache = AnalysisCache(path=self.path)
+        cache.set("first transcript", "full", self.result)
+        self.assertIsNone(cache.get("first transcript, another video", "full"))
+
+    def test_version_change_invalidates(self):
+        AnalysisCache(path=self.path, version="1").set("transcript", "full", self.result)
+        self.assertEqual(AnalysisCache(path=self.path, version="1").get("transcript", "full"), self.result)
+        self.assertIsNone(AnalysisCache(path=self.path, version="2").get("transcript", "full"))
+
+    def test_memory_hit_returns_copy(self):
+        cache = AnalysisCache(path=self.path)
+        cache.set("transcript", "full", self.result)
+        os.remove(self.path)
+        hit = cache.get("transcript", "full")
+        self.assertEqual(hit, self.result)
+        hit["analysis"] = "changed"
+        self.assertEqual(cache.get("transcript", "full"), self.result)
+
+
+if __name__ == '__main__':
+    unittest.main()
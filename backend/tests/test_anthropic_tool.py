@@ -0,0 +1,166 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+from anthropic import APIConnectionError, APIStatusError, APITimeoutError
+
+from director.tools import anthropic_tool
+from director.llm.base import LLMResponseStatus
+from director.tools.anthropic_tool import AnthropicTool, RateLimitCircuitOpen, _RateLimitBreaker, _is_retryable
+
+REQUEST = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+
+
+def _status_error(status_code):
+    return APIStatusError("error", response=httpx.Response(status_code, request=REQUEST), body=None)
+
+
+class TestIsRetryable(unittest.TestCase):
+    def test_transient_failures_are_retried(self):
+        for error in (APITimeoutError(request=REQUEST), APIConnectionError(request=REQUEST), _status_error(429), _status_error(500), _status_error(529)):
+            self.assertTrue(_is_retryable(error), error)
+
+    def test_client_errors_fail_fast(self):
+        for error in (_status_error(400), _status_error(401), _status_error(404), ValueError("bad input")):
+            self.assertFalse(_is_retryable(error), error)
+
+
+class TestRateLimitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = patch("director.tools.anthropic_tool.time")
+        patcher.start().monotonic.side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+        self.breaker = _RateLimitBreaker(trip_after=3, cooldown=30)
+
+    def test_trips_after_consecutive_rate_limits(self):
+        for _ in range(2):
+            self.breaker.record(_status_error(429))
+        self.breaker.check()
+        self.breaker.record(_status_error(429))
+        with self.assertRaises(RateLimitCircuitOpen):
+            self.breaker.check()
+
+    def test_closes_after_cooldown(self):
+        for _ in range(3):
+            self.breaker.record(_status_error(429))
+        self.now += 29
+        with self.assertRaises(RateLimitCircuitOpen):
+            self.breaker.check()
+        self.now += 1
+        self.breaker.check()
+
+    def test_success_resets_the_count(self):
+        for _ in range(2):
+            self.breaker.record(_status_error(429))
+        self.breaker.record(None)
+        for _ in range(2):
+            self.breaker.record(_status_error(429))
+        self.breaker.check()
+
+    def test_other_errors_do_not_count(self):
+        for _ in range(5):
+            self.breaker.record(_status_error(500))
+        self.breaker.check()
+
+
+class TestCreateRetries(unittest.TestCase):
+    def setUp(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}):
+            self.tool = AnthropicTool()
+        self.tool.client = Mock()
+        for patcher in (
+            patch.object(anthropic_tool, "_breaker", _RateLimitBreaker(trip_after=5, cooldown=30)),
+            patch.object(AnthropicTool._create.retry, "sleep", Mock()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_server_error_is_retried(self):
+        self.tool.client.messages.create.side_effect = [_status_error(500), "response"]
+        self.assertEqual(self.tool._create({}), "response")
+        self.assertEqual(self.tool.client.messages.create.call_count, 2)
+
+    def test_bad_request_is_not_retried(self):
+        self.tool.client.messages.create.side_effect = _status_error(400)
+        with self.assertRaises(APIStatusError):
+            self.tool._create({})
+        self.assertEqual(self.tool.client.messages.create.call_count, 1)
+
+    def test_open_breaker_skips_the_api(self):
+        for _ in range(5):
+            anthropic_tool._breaker.record(_status_error(429))
+        with self.assertRaises(RateLimitCircuitOpen):
+            self.tool._create({})
+        self.tool.client.messages.create.assert_not_called()
+
+
+class TestPromptCache(unittest.TestCase):
+    def setUp(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}):
+            self.tool = AnthropicTool()
+        self.long_text = "x" * (anthropic_tool.MIN_CACHEABLE_PROMPT_TOKENS * anthropic_tool.APPROX_CHARS_PER_TOKEN)
+
+    def _params(self, cached_text):
+        return self.tool._build_params([
+            {"role": "system", "content": "You are an expert."},
+            {"role": "user", "content": [
+                {"type": "text", "text": cached_text, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": "Now answer."},
+            ]},
+        ], temperature=0.7, max_tokens=100)
+
+    def test_long_prefix_keeps_its_breakpoint_and_sends_the_beta_header(self):
+        params = self._params(self.long_text)
+        self.assertEqual(params["messages"][0]["content"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(params["extra_headers"], {"anthropic-beta": anthropic_tool.PROMPT_CACHING_BETA})
+
+    def test_short_prefix_is_sent_without_cache_markers(self):
+        params = self._params("short analysis")
+        self.assertEqual(params["messages"][0]["content"][0], {"type": "text", "text": "short analysis"})
+        self.assertNotIn("extra_headers", params)
+
+    def test_plain_prompts_are_unchanged(self):
+        params = self.tool._build_params([{"role": "user", "content": self.long_text}], temperature=0.7, max_tokens=100)
+        self.assertEqual(params["messages"], [{"role": "user", "content": self.long_text}])
+        self.assertNotIn("extra_headers", params)
+
+
+class TestAsyncChatCompletions(unittest.TestCase):
+    def setUp(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}):
+            self.tool = AnthropicTool()
+        for patcher in (
+            patch.object(anthropic_tool, "_breaker", _RateLimitBreaker(trip_after=5, cooldown=30)),
+            patch.object(AnthropicTool._acreate.retry, "sleep", AsyncMock()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_async_client_is_built_on_first_use_and_closed(self):
+        self.assertIsNone(self.tool._async_client)
+        client = self.tool.async_client
+        self.assertIs(self.tool.async_client, client)
+        with patch.object(client, "close", AsyncMock()) as close:
+            asyncio.run(self.tool.aclose())
+        close.assert_awaited_once()
+        self.assertIsNone(self.tool._async_client)
+        asyncio.run(self.tool.aclose())
+
+    def test_transient_error_is_retried_without_blocking(self):
+        message = Mock(content=[Mock(text="analysis")], usage=Mock(input_tokens=10, output_tokens=5), stop_reason="end_turn")
+        self.tool._async_client = Mock()
+        self.tool._async_client.messages.create = AsyncMock(side_effect=[_status_error(503), message])
+
+        response = asyncio.run(self.tool.chat_completions_async([{"role": "user", "content": "hi"}], max_tokens=100))
+
+        self.assertEqual(response.status, LLMResponseStatus.SUCCESS)
+        self.assertEqual(response.content, "analysis")
+        self.assertEqual(self.tool._async_client.messages.create.await_count, 2)
+        AnthropicTool._acreate.retry.sleep.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
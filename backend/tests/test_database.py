@@ -0,0 +1,23 @@
+import unittest
+
+from sqlalchemy import inspect
+
+from director.core.database import Session, _create_engine, _create_schema
+
+
+class TestDatabaseSetup(unittest.TestCase):
+    def test_in_memory_sqlite_engine_builds_schema(self):
+        engine = _create_engine("sqlite:///:memory:")
+        _create_schema(engine)
+        self.assertIn("analysis", inspect(engine).get_table_names())
+
+    def test_sessions_expire_on_commit_by_default(self):
+        session = Session()
+        try:
+            self.assertTrue(session.expire_on_commit)
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
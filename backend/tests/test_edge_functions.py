@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+from director.edge_functions import StructuredDataFunction, VoicePromptFunction
+from director.edge_functions import voice_prompt
+
+STRUCTURED_DATA = {
+    "sales_techniques": [
+        {"name": "SPIN Selling", "description": "Ask situation questions", "examples": ["What do you use today?"]}
+    ],
+    "communication_strategies": [{"type": "Active Listening", "description": "Mirror the customer"}],
+    "objection_handling": [{"objection": "Too expensive", "response": "Focus on value"}],
+    "voice_agent_guidelines": [{"type": "dont", "description": "Interrupt", "context": "While pricing"}],
+}
+
+
+class TestEdgeFunctions(unittest.TestCase):
+    def setUp(self):
+        voice_prompt._PROMPT_CACHE.clear()
+
+    def test_structured_data_function_builds(self):
+        with patch("director.edge_functions.structured_data.AsyncOpenAI"):
+            function = StructuredDataFunction(Mock())
+        self.assertTrue(function.validate_input({"video_id": "v1", "transcript_chunks": []}))
+
+    def test_prompt_template_renders_every_section(self):
+        with patch("director.edge_functions.voice_prompt.AsyncAnthropic"):
+            function = VoicePromptFunction(Mock())
+        prompt = function._generate_prompt_template(STRUCTURED_DATA)
+        self.assertIn("\n- SPIN Selling: Ask situation questions\n  Example: What do you use today?", prompt)
+        self.assertIn("Communication Strategies:\n- Active Listening: Mirror the customer", prompt)
+        self.assertIn("\n- When hearing: Too expensive\n  Respond with: Focus on value", prompt)
+        self.assertIn("\n- Don't: Interrupt\n  Context: While pricing", prompt)
+        self.assertNotIn("{techniques}", prompt)
+
+    def test_identical_structured_data_reuses_generated_prompt(self):
+        with patch("director.edge_functions.voice_prompt.AsyncAnthropic") as client_cls:
+            function = VoicePromptFunction(Mock())
+        create = client_cls.return_value.messages.create = AsyncMock(
+            return_value=Mock(content=[Mock(text='{"voice_characteristics": {"tone": "warm"}}')])
+        )
+        first = asyncio.run(function._generate_voice_prompt(STRUCTURED_DATA))
+        second = asyncio.run(function._generate_voice_prompt(dict(STRUCTURED_DATA)))
+        self.assertEqual(first, {"voice_characteristics": {"tone": "warm"}})
+        self.assertEqual(second, first)
+        create.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
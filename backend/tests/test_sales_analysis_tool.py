@@ -0,0 +1,108 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import httpx
+from openai import APIConnectionError
+
+from director.tools.sales_analysis_tool import AnalysisResult, SalesAnalysisTool, _partial_analysis
+
+
+def _tool_call_stream(*arguments):
+    """Streamed chat completion chunks carrying emit_sales_analysis arguments"""
+    for part in arguments:
+        call = SimpleNamespace(function=SimpleNamespace(arguments=part))
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(tool_calls=[call]))])
+
+
+class TestPartialAnalysis(unittest.TestCase):
+    def test_every_prefix_decodes_to_a_prefix_of_the_analysis(self):
+        analysis = '# Summary\n"Quoted" café \\ done'
+        arguments = json.dumps({"analysis": analysis, "structured_data": {}})
+        for end in range(len(arguments) + 1):
+            partial = _partial_analysis(arguments[:end])
+            if partial is not None:
+                self.assertTrue(analysis.startswith(partial), arguments[:end])
+        self.assertEqual(_partial_analysis(arguments), analysis)
+
+    def test_incomplete_escape_is_held_back(self):
+        self.assertEqual(_partial_analysis('{"analysis": "ab\\u00'), "ab")
+        self.assertEqual(_partial_analysis('{"analysis": "ab\\'), "ab")
+
+    def test_missing_field_returns_none(self):
+        self.assertIsNone(_partial_analysis('{"struct'))
+
+
+class TestAnalyzeConversation(unittest.TestCase):
+    def setUp(self):
+        self.tool = SalesAnalysisTool(api_key="test")
+        self.tool.client = Mock()
+        self.stepwise_result = AnalysisResult(raw_analysis="stepwise", structured_data={}, voice_prompt="Hello!")
+
+    def test_combined_call_runs_on_the_combined_model(self):
+        arguments = json.dumps({"analysis": "# Summary", "structured_data": {}, "voice_prompt": "Hello!"})
+        self.tool.client.chat.completions.create.return_value = _tool_call_stream(arguments[:10], arguments[10:])
+
+        result = self.tool.analyze_conversation("transcript")
+
+        self.assertEqual(self.tool.client.chat.completions.create.call_args.kwargs["model"], SalesAnalysisTool.combined_model)
+        self.assertEqual(result.raw_analysis, "# Summary")
+        self.assertEqual(result.metadata["model"], SalesAnalysisTool.combined_model)
+
+    def test_unparseable_combined_output_falls_back_to_stepwise(self):
+        self.tool.client.chat.completions.create.return_value = _tool_call_stream('{"analysis": "cut off')
+        with patch.object(self.tool, "analyze_conversation_stepwise", return_value=self.stepwise_result) as stepwise:
+            result = self.tool.analyze_conversation("transcript")
+        stepwise.assert_called_once()
+        self.assertIs(result, self.stepwise_result)
+
+    def test_api_error_is_raised_without_rerunning_stepwise(self):
+        self.tool.client.chat.completions.create.side_effect = APIConnectionError(
+            request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        )
+        with patch.object(self.tool, "analyze_conversation_stepwise") as stepwise:
+            with self.assertRaises(APIConnectionError):
+                self.tool.analyze_conversation("transcript")
+        stepwise.assert_not_called()
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tool = SalesAnalysisTool(api_key="test")
+        self.tool.client = Mock()
+
+    def test_submit_uploads_one_request_per_transcript_and_returns_at_once(self):
+        self.tool.client.files.create.return_value = SimpleNamespace(id="file-1")
+        self.tool.client.batches.create.return_value = SimpleNamespace(id="batch-1", status="validating")
+
+        self.assertEqual(self.tool.submit_batch({"c1:v1": "first", "c2:v1": "second"}), "batch-1")
+
+        _, content = self.tool.client.files.create.call_args.kwargs["file"]
+        requests = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([request["custom_id"] for request in requests], ["c1:v1", "c2:v1"])
+        self.assertIn("second", requests[1]["body"]["messages"][1]["content"])
+        self.tool.client.batches.retrieve.assert_not_called()
+
+    def test_collect_returns_none_while_running(self):
+        self.tool.client.batches.retrieve.return_value = SimpleNamespace(status="in_progress", output_file_id=None)
+        self.assertIsNone(self.tool.collect_batch("batch-1"))
+        self.tool.client.files.content.assert_not_called()
+
+    def test_collect_maps_results_by_custom_id_and_skips_failures(self):
+        arguments = json.dumps({"analysis": "# Summary", "structured_data": {}, "voice_prompt": "Hello!"})
+        lines = [
+            {"custom_id": "c1:v1", "response": {"body": {"choices": [{"message": {"tool_calls": [{"function": {"arguments": arguments}}]}}]}}},
+            {"custom_id": "c2:v1", "response": None, "error": {"message": "server error"}},
+        ]
+        self.tool.client.batches.retrieve.return_value = SimpleNamespace(status="completed", output_file_id="file-2")
+        self.tool.client.files.content.return_value = SimpleNamespace(text="\n".join(json.dumps(line) for line in lines))
+
+        results = self.tool.collect_batch("batch-1")
+
+        self.assertEqual(list(results), ["c1:v1"])
+        self.assertEqual(results["c1:v1"].raw_analysis, "# Summary")
+
+
+if __name__ == "__main__":
+    unittest.main()
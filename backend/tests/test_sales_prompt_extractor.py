@@ -0,0 +1,297 @@
+import json
+import logging
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import httpx
+from openai import APIConnectionError
+from sqlalchemy import delete, select
+
+from director.agents import sales_prompt_extractor
+from director.agents.base import AgentStatus
+from director.agents.sales_prompt_extractor import SalesPromptExtractorAgent, _CleanLogFormatter, session_scope
+from director.core.database import Analysis
+from director.tools.sales_analysis_tool import AnalysisResult
+
+ANALYSIS_RESULT = {
+    "analysis": "## Analysis\nSPIN selling",
+    "structured_data": {"sales_techniques": [{"name": "SPIN Selling"}]},
+    "voice_prompt": "Hello! Ask situation questions first.",
+    "training_data": [{"input": "Too expensive", "output": "Focus on value"}],
+    "few_shot_examples": [{"context": "Pricing", "input": "Too expensive", "response": "Focus on value", "reasoning": "Value framing"}],
+}
+
+
+class _WordTokenizer:
+    """Stand-in for tiktoken where every word is one token"""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def _make_agent():
+    """Agent with its transcript, tokenizer, cache and Supabase store mocked out"""
+    session = Mock()
+    session.output_message.content = []
+    session.output_message.add_content.side_effect = session.output_message.content.append
+    with patch("director.agents.sales_prompt_extractor.SupabaseVectorStore"):
+        agent = SalesPromptExtractorAgent(session)
+    agent.vector_store.tokenizer.encode.return_value = [0] * 10
+    agent._prompt_cache = Mock(**{"get.return_value": None})
+    agent._get_transcript = Mock(return_value="transcript")
+    return agent
+
+
+class TestCleanLogFormatter(unittest.TestCase):
+    def test_formatted_line_is_ascii_with_arrows_spelled_out(self):
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "close → follow up %s", ("café",), None)
+        self.assertEqual(_CleanLogFormatter().format(record), "close -> follow up caf?")
+
+
+@patch.multiple(sales_prompt_extractor, MAX_TRANSCRIPT_TOKENS=20, MAP_CHUNK_TOKENS=12, MAP_CHUNK_OVERLAP=2)
+class TestFitTranscript(unittest.TestCase):
+    def setUp(self):
+        self.agent = _make_agent()
+        self.agent.vector_store.tokenizer = _WordTokenizer()
+        self.agent.sales_tool = Mock()
+        self.agent._process_long_transcript = Mock(return_value="relevant chunks")
+        self.content = sales_prompt_extractor.SalesAnalysisContent()
+        self.transcript = " ".join(f"w{i}" for i in range(30))
+
+    def _fit(self, transcript):
+        return self.agent._fit_transcript(transcript, self.content, "v1", "c1")
+
+    def test_transcript_within_budget_is_unchanged(self):
+        self.assertEqual(self._fit("short transcript"), "short transcript")
+        self.assertEqual(self.content.transcript_tokens, 2)
+        self.agent.sales_tool.extract_highlights.assert_not_called()
+
+    def test_long_transcript_is_condensed_chunk_by_chunk(self):
+        self.agent.sales_tool.extract_highlights.side_effect = lambda chunk: chunk.split()[0]
+        fitted = self._fit(self.transcript)
+        self.assertEqual(self.agent.sales_tool.extract_highlights.call_count, 3)
+        self.assertEqual(fitted, "Part 1 of 3:\nw0\n\nPart 2 of 3:\nw10\n\nPart 3 of 3:\nw20")
+        self.assertEqual(self.content.transcript_tokens, 30)
+        self.agent._process_long_transcript.assert_not_called()
+
+    def test_failed_map_reduce_falls_back_to_relevant_chunks(self):
+        self.agent.sales_tool.extract_highlights.side_effect = RuntimeError("API down")
+        self.assertEqual(self._fit(self.transcript), "relevant chunks")
+        self.agent._process_long_transcript.assert_called_once_with(self.transcript, "v1", "c1")
+
+    def test_truncates_when_condensing_does_not_fit(self):
+        self.agent._process_long_transcript.return_value = self.transcript
+        self.agent.sales_tool.extract_highlights.side_effect = lambda chunk: chunk
+        fitted = self._fit(self.transcript)
+        self.assertEqual(fitted, " ".join(self.transcript.split()[:20]))
+
+
+class TestThrottledPush(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch("director.agents.sales_prompt_extractor.time")
+        patcher.start().monotonic.side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+        self.agent = _make_agent()
+
+    def _pushed(self):
+        return [c.kwargs["progress"] for c in self.agent.output_message.push_update.call_args_list]
+
+    def test_intermediate_updates_within_the_interval_are_dropped(self):
+        self.agent._throttled_push(0.1)
+        self.now += 0.1
+        self.agent._throttled_push(0.2)
+        self.now += 0.2
+        self.agent._throttled_push(0.3)
+        self.assertEqual(self._pushed(), [0.1, 0.3])
+
+    def test_start_and_finish_are_always_pushed(self):
+        self.agent._throttled_push(0.5)
+        self.agent._throttled_push(1.0)
+        self.agent._throttled_push(0.0)
+        self.assertEqual(self._pushed(), [0.5, 1.0, 0.0])
+
+
+class TestGenerateVoicePrompt(unittest.TestCase):
+    def test_plain_string_items_are_listed_as_text(self):
+        analysis = json.dumps({
+            "sales_techniques": ["Assumptive close", {"name": "SPIN Selling", "description": "Ask situation questions"}],
+            "communication_strategies": ["Mirror the customer"],
+            "objection_handling": ["Too expensive"],
+            "voice_agent_guidelines": "Speak slowly",
+        })
+        prompt = _make_agent()._generate_voice_prompt(analysis)
+        self.assertIn("Key Sales Techniques:\n- Assumptive close\n- SPIN Selling: Ask situation questions", prompt)
+        self.assertIn("Key Communication Approaches:\n- Mirror the customer", prompt)
+        self.assertIn("Objection Handling:\n- When hearing: Too expensive", prompt)
+        self.assertNotIn("Voice Agent Guidelines", prompt)
+
+
+class TestCoalescedRuns(unittest.TestCase):
+    def test_concurrent_runs_share_one_analysis(self):
+        leader, follower = _make_agent(), _make_agent()
+        started, release, waiting = threading.Event(), threading.Event(), threading.Event()
+
+        def analyze(transcript, text_content):
+            started.set()
+            release.wait(5)
+            return ANALYSIS_RESULT
+
+        def log_info(msg, *args):
+            if "already running" in msg:
+                waiting.set()
+
+        leader._analyze_content = Mock(side_effect=analyze)
+        follower._analyze_content = Mock(return_value=ANALYSIS_RESULT)
+        responses = {}
+
+        def run(name, agent):
+            responses[name] = agent.run(video_id="v1", collection_id="c1")
+
+        with patch.object(sales_prompt_extractor.logger, "info", side_effect=log_info):
+            leader_thread = threading.Thread(target=run, args=("leader", leader))
+            leader_thread.start()
+            self.assertTrue(started.wait(5))
+            follower_thread = threading.Thread(target=run, args=("follower", follower))
+            follower_thread.start()
+            self.assertTrue(waiting.wait(5))
+            release.set()
+            leader_thread.join(5)
+            follower_thread.join(5)
+
+        leader._analyze_content.assert_called_once()
+        follower._analyze_content.assert_not_called()
+        self.assertIs(responses["follower"], responses["leader"])
+        leader_content = leader.output_message.content[0]
+        follower_content = follower.output_message.content[0]
+        self.assertEqual(follower_content.model_dump(), leader_content.model_dump())
+        self.assertEqual(follower_content.few_shot_examples, ANALYSIS_RESULT["few_shot_examples"])
+        self.assertEqual(follower_content.transcript_tokens, 10)
+
+
+class TestTerminalFailures(unittest.TestCase):
+    def setUp(self):
+        with session_scope() as db_session:
+            db_session.add(Analysis(video_id="v-gate", collection_id="c1", transcript="transcript", status="processing"))
+        self.addCleanup(self._delete_rows)
+        self.agent = _make_agent()
+
+    def _delete_rows(self):
+        with session_scope() as db_session:
+            db_session.execute(delete(Analysis).where(Analysis.video_id == "v-gate"))
+
+    def _stored(self):
+        with session_scope() as db_session:
+            analysis = db_session.scalar(select(Analysis).where(Analysis.video_id == "v-gate"))
+            return analysis.status, analysis.meta_data
+
+    def _run(self, **kwargs):
+        return self.agent.run(video_id="v-gate", collection_id="c1", **kwargs)
+
+    def test_unusable_output_is_not_rerun_unless_requested(self):
+        self.agent._analyze_content = Mock(return_value=None)
+        self.assertEqual(self._run().status, AgentStatus.ERROR)
+        self.assertEqual(self._stored(), ("error", {"error": "Failed to analyze content", "retryable": False}))
+
+        response = self._run()
+        self.assertEqual(response.data, {"error": "Failed to analyze content", "retryable": False})
+        self.agent._get_transcript.assert_called_once()
+        self.agent._analyze_content.assert_called_once()
+
+        self.agent._analyze_content.return_value = ANALYSIS_RESULT
+        self.assertEqual(self._run(retry_failed=True).status, AgentStatus.SUCCESS)
+        self.assertEqual(self._stored(), ("success", {}))
+
+    def test_api_errors_stay_retryable(self):
+        self.agent._analyze_content = Mock(side_effect=[
+            APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")),
+            ANALYSIS_RESULT,
+        ])
+        self.assertEqual(self._run().status, AgentStatus.ERROR)
+        self.assertIs(self._stored()[1]["retryable"], True)
+        self.assertEqual(self._run().status, AgentStatus.SUCCESS)
+        self.assertEqual(self.agent._analyze_content.call_count, 2)
+
+
+class TestBatchRuns(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(self._delete_rows)
+        self.agent = _make_agent()
+        self.agent.sales_tool = Mock(**{"submit_batch.return_value": "batch-1"})
+
+    def _delete_rows(self):
+        with session_scope() as db_session:
+            db_session.execute(delete(Analysis).where(Analysis.video_id.like("v-batch%")))
+
+    def _stored(self, collection_id, video_id="v-batch"):
+        with session_scope() as db_session:
+            analysis = db_session.scalar(select(Analysis).where(
+                Analysis.video_id == video_id, Analysis.collection_id == collection_id
+            ))
+            return analysis.status, analysis.meta_data
+
+    def _submit(self):
+        return self.agent.run_batch(jobs=[
+            {"video_id": "v-batch", "collection_id": "c1"},
+            {"video_id": "v-batch", "collection_id": "c1"},
+            {"video_id": "v-batch", "collection_id": "c2"},
+        ])
+
+    def test_jobs_are_keyed_by_collection_and_video(self):
+        response = self._submit()
+        self.agent.sales_tool.submit_batch.assert_called_once_with({"c1:v-batch": "transcript", "c2:v-batch": "transcript"})
+        self.assertEqual(response.data["batch_id"], "batch-1")
+        self.assertEqual(response.data["pending"], ["c1:v-batch", "c2:v-batch"])
+        for collection_id in ("c1", "c2"):
+            status, meta_data = self._stored(collection_id)
+            self.assertEqual(status, "batch_pending")
+            self.assertEqual(meta_data["batch_id"], "batch-1")
+
+    def test_results_are_collected_once_the_batch_finishes(self):
+        self._submit()
+        self.agent.sales_tool.collect_batch.return_value = None
+        response = self.agent.run(collection_id="c1", batch_id="batch-1")
+        self.assertEqual(response.data, {"batch_id": "batch-1", "status": "pending"})
+        self.assertEqual(self._stored("c1")[0], "batch_pending")
+
+        self.agent.sales_tool.collect_batch.return_value = {
+            "c1:v-batch": AnalysisResult(raw_analysis="# Summary", structured_data={}, voice_prompt="Hello!")
+        }
+        response = self.agent.run(collection_id="c1", batch_id="batch-1")
+
+        self.assertEqual(response.status, AgentStatus.SUCCESS)
+        self.assertEqual(response.data["results"]["c1:v-batch"]["voice_prompt"], "Hello!")
+        self.assertEqual(response.data["results"]["c2:v-batch"], {"error": "analysis_failed"})
+        self.assertEqual(self._stored("c1")[0], "success")
+        self.assertEqual(self._stored("c2")[0], "error")
+        self.agent.vector_store.store_generated_output.assert_called_once()
+
+    def test_transcription_agent_calls_take_turns(self):
+        del self.agent._get_transcript
+        active, overlaps = [0], []
+        lock = threading.Lock()
+
+        def transcribe(video_id, collection_id):
+            with lock:
+                active[0] += 1
+                overlaps.append(active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return Mock(status=AgentStatus.SUCCESS, data={"transcript": f"transcript of {video_id}"})
+
+        self.agent.transcription_agent = Mock(**{"run.side_effect": transcribe})
+        response = self.agent.run(collection_id="c1", batch_video_ids=[f"v-batch-{i}" for i in range(4)])
+
+        self.assertEqual(self.agent.transcription_agent.run.call_count, 4)
+        self.assertEqual(max(overlaps), 1)
+        self.assertEqual(len(response.data["pending"]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()